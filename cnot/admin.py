@@ -237,6 +237,8 @@ class LeadRequestAdmin(admin.ModelAdmin):
         "email",
         "phone",
         "status",
+        "attempts",
+        "next_attempt_at",
         "created",
     )
     readonly_fields = (
@@ -1,14 +1,18 @@
 import logging
-from typing import List
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List
 
 import orjson
 from common.djangoapps.student.models import UserProfile
-from django.http import HttpRequest
+from django.conf import settings
+from django.http import Http404, HttpRequest
 from django.contrib.auth.models import User
+from django.db.models import Prefetch, Q
 from django.shortcuts import get_object_or_404
-from ninja import NinjaAPI, FilterSchema, Field, Query
+from django.utils import timezone
+from ninja import NinjaAPI, Field, Query, Schema
 from ninja.renderers import BaseRenderer
-from ninja.security import django_auth
+from ninja.security import django_auth, django_auth_superuser
 from ninja.pagination import paginate
 from ninja.errors import AuthenticationError
 from ninja_extra.searching import searching, Searching
@@ -16,23 +20,34 @@ from ninja_extra import api_controller, route, NinjaExtraAPI
 from opaque_keys.edx.keys import CourseKey
 from openedx.core.djangoapps.enrollments import api as enrollments_api
 
-from typing import Optional
+from typing import Literal, Optional
+from .cache import cache_response, store_response
+from .core.lookup import lookup_published
 from .core.models import Program, Project, Organization
-from .courses.data_api import get_course_enrollments, get_liked_courses
+from .courses.data_api import get_user_courses_summary
+from .courses.catalog import catalog_facets
 from .courses.models import Course, LikedCourse
+from .courses.search import get_search_backend
 from .learners.models import ProgramEnrollment, LearningRequest
+from .pagination import CursorPagination
 from .profiles.models import UrFUProfile
 from .schema import (
     UserProfileSchema,
     UrFUProfileSchema,
     UrFUProfileIn,
     ProgramEnrollmentIn,
+    BulkProgramEnrollmentIn,
     LikedCourseIn,
+    LikedCoursesIn,
+    CourseEnrollmentSchema,
+    CourseFacetsSchema,
     CourseSchema,
+    CourseSearchHitSchema,
     OrganizationSchema,
     ProgramSchema,
     ProjectSchema,
 )
+from .serialization import ProgramsWithCourses, attach_courses
 
 log = logging.getLogger(__name__)
 
@@ -48,7 +63,13 @@ class ORJSONRenderer(BaseRenderer):
         return orjson.dumps(data, default=self.default)
 
 
-api = NinjaAPI(renderer=ORJSONRenderer(), csrf=True)
+class CNOTNinjaAPI(NinjaAPI):
+    def create_response(self, request, data, *, status=None, temporal_response=None):
+        response = super().create_response(request, data, status=status, temporal_response=temporal_response)
+        return store_response(request, response)
+
+
+api = CNOTNinjaAPI(renderer=ORJSONRenderer(), csrf=True)
 
 
 @api.exception_handler(AuthenticationError)
@@ -63,8 +84,57 @@ def authentication_error(request: HttpRequest, exc: AuthenticationError):
     return api.create_response(request, {"detail": "Unauthorized"}, status=401)
 
 
-class CourseFilterSchema(FilterSchema):
-    search: Optional[str] = Field(q=["course_overview__display_name__icontains", "display_name_f__icontains"])
+def day_start(day):
+    """
+    Start of ``day`` in the current time zone. Range lookups against it can use an index, unlike ``__date``.
+    """
+    start = datetime.combine(day, time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+class CourseFilterSchema(Schema):
+    """
+    Course catalog filters. Full-text ``search`` is a separate parameter served by the search backend.
+
+    Filters with lists match any of the values, e.g. ``?language=ru&language=en``.
+    """
+    language: Optional[List[str]] = None
+    organization: Optional[List[str]] = None
+    duration_min: Optional[int] = Field(None, description="Shortest duration, weeks")
+    duration_max: Optional[int] = Field(None, description="Longest duration, weeks")
+    labor: Optional[List[int]] = Field(None, description="Labor, credits")
+    external: Optional[bool] = None
+    enrollment_allowed: Optional[bool] = None
+    program: Optional[List[str]] = Field(None, description="Program slugs")
+    start_after: Optional[date] = None
+    start_before: Optional[date] = None
+
+    def filter(self, qs):
+        q = Q()
+        if self.language:
+            q &= Q(catalog_entry__language__in=self.language)
+        if self.organization:
+            q &= Q(catalog_entry__organization__in=self.organization)
+        if self.duration_min is not None:
+            q &= Q(min_duration__gte=self.duration_min)
+        if self.duration_max is not None:
+            q &= Q(max_duration__lte=self.duration_max) | Q(
+                max_duration__isnull=True, min_duration__lte=self.duration_max,
+            )
+        if self.labor:
+            q &= Q(labor__in=self.labor)
+        if self.external is not None:
+            q &= Q(external=self.external)
+        if self.enrollment_allowed is not None:
+            q &= Q(enrollment_allowed=self.enrollment_allowed)
+        if self.program:
+            # a subquery instead of a join keeps courses of several programs unique
+            q &= Q(id__in=Program.courses.through.objects.filter(program__slug__in=self.program).values("course_id"))
+        if self.start_after:
+            q &= Q(catalog_entry__start_date__gte=day_start(self.start_after))
+        if self.start_before:
+            q &= Q(catalog_entry__start_date__lt=day_start(self.start_before + timedelta(days=1)))
+        return qs.filter(q)
 
 
 @api.get("/me", auth=django_auth, response=UserProfileSchema)
@@ -102,15 +172,19 @@ def fill_profile(request, payload: UrFUProfileIn):
     return learning_request
 
 
-@api.get("/courses/my", auth=django_auth)
+@api.get("/courses/my", auth=django_auth, response=List[CourseEnrollmentSchema])
 def my(request):
-    enrollments = get_course_enrollments(request.auth, include_inactive=False)
-    return enrollments
+    summary = get_user_courses_summary(request.auth)
+    return [enrollment for enrollment in summary.enrollments if enrollment.is_active]
 
 
 @api.get("/courses/{int:course_id}/my", auth=django_auth)
 def add_course_enrollment(request, course_id: int):
-    course = get_object_or_404(Course, id=course_id)
+    course = get_object_or_404(Course.objects.select_related("course_overview"), id=course_id)
+    # the enrollments API is only asked about enrollments the cached summary knows of
+    summary = get_user_courses_summary(request.auth)
+    if str(course.course_id) not in {enrollment.course_id for enrollment in summary.enrollments}:
+        return None
     enrollment = enrollments_api.get_enrollment(request.auth, str(course.course_id))
     return enrollment
 
@@ -122,59 +196,185 @@ def add_course_enrollment(request, course_id: int):
     return enrollment
 
 
+# Data of the read-only endpoints, shared with their async variants in ``cnot.async_api``.
+# Querysets are returned unevaluated, so views can paginate them.
+
+def parse_expand(expand):
+    return {name.strip() for name in expand.split(",") if name.strip()}
+
+
+def published_orgs():
+    return Organization.objects.filter(active=True, status="published")
+
+
+def published_projects(expand):
+    """
+    ``expand=programs`` lists programs of the projects, ``expand=programs,courses`` adds full courses to them.
+    """
+    qs = Project.objects.filter(active=True, status="published").select_related("owner")
+    if "programs" not in expand:
+        return qs
+    qs = qs.prefetch_related(
+        Prefetch("realized_programs", queryset=published_programs(), to_attr="expanded_programs")
+    )
+    return ProgramsWithCourses(qs, expand, programs_attr="expanded_programs")
+
+
+def published_programs():
+    return Program.objects.filter(active=True, status="published").select_related("owner")
+
+
+def program_detail(id, expand):
+    program = lookup_published(Program, id)
+    if program is None:
+        raise Http404
+    return attach_courses([program], expand)[0]
+
+
+def catalog_courses(user, filters, search=None, search_mode="fulltext", ordering="id"):
+    """
+    Catalog payloads of courses matching ``filters`` and ``search``. Superusers see all courses.
+    """
+    if user is not None and user.is_superuser:  # Суперюзерам показываем все курсы
+        qs = Course.objects.all()
+    else:
+        qs = Course.objects.catalog_visible()
+    qs = filters.filter(qs).order_by("id")
+    if search and search_mode == "trigram":  # Поиск с опечатками по названию и авторам
+        qs = get_search_backend().similar(qs, search)
+    elif search:  # Сначала самые релевантные
+        qs = get_search_backend().filter(qs, search)
+    if ordering != "id":
+        qs = qs.order_by_counter(ordering)
+    return qs.catalog_payloads()
+
+
+def course_detail(id):
+    qs = Course.objects.filter(id=id) if id.isnumeric() else Course.objects.filter(slug=id)
+    payloads = qs.catalog_payloads()[:1]
+    if not payloads:
+        raise Http404
+    return payloads[0]
+
+
 @api.get("/orgs", response=List[OrganizationSchema])
-@paginate
+@cache_response
+@paginate(CursorPagination)
 def orgs(request):
-    qs = Organization.objects.filter(active=True, status="published")
-    return qs
+    return published_orgs()
+
+
+@api.get("/orgs/{str:id}", response=OrganizationSchema)
+@cache_response
+def get_org(request, id: str):
+    """
+    Organization by slug, uuid or short name.
+    """
+    org = lookup_published(Organization, id)
+    if org is None:
+        raise Http404
+    return org
 
 
 @api.get(
     "/projects", response=List[ProjectSchema]
 )  # description="Creates an order and updates stock"
-@paginate
-def projects(request):
-    qs = Project.objects.filter(active=True, status="published")
-    return qs
+@cache_response
+@paginate(CursorPagination, ordering=("modified", "pk"))
+def projects(request, expand: str = ""):
+    return published_projects(parse_expand(expand))
+
+
+@api.get("/projects/{str:id}", response=ProjectSchema)
+@cache_response
+def get_project(request, id: str, expand: str = "programs"):
+    """
+    Project by slug, uuid or short name.
+    """
+    project = lookup_published(Project, id)
+    if project is None:
+        raise Http404
+    expand = parse_expand(expand)
+    if "programs" in expand:
+        project.expanded_programs = attach_courses(published_programs().filter(project=project), expand)
+    return project
 
 
 @api.get("/programs", response=List[ProgramSchema])
-@paginate
-def programs(request):
-    qs = Program.objects.filter(active=True, status="published")
-    return qs
+@cache_response
+@paginate(CursorPagination, ordering=("modified", "pk"))
+def programs(request, expand: str = ""):
+    """
+    Programs with brief courses; ``expand=courses`` returns full courses.
+    """
+    return ProgramsWithCourses(published_programs(), parse_expand(expand))
+
 
 @api.get("/programs/{str:id}", response=ProgramSchema)  # TODO: В списке курсов отдавать только опубликованные
-def get_program(request, id: str):
-    programs = Program.objects.filter(active=True, status="published")
-    program = get_object_or_404(programs, slug=id)  # TODO: Отдавать только активные и опубликованные. Это же с курсами (если не суперюзер)
-    log.warning(f"PROGRAM: {program}; SLUG: {id}")
-    return program
+@cache_response
+def get_program(request, id: str, expand: str = "courses"):
+    """
+    Program by slug, uuid or short name.
+    """
+    return program_detail(id, parse_expand(expand))
+
+
+CourseOrdering = Literal["id", "likes", "-likes", "learning_requests", "-learning_requests", "enrollments", "-enrollments"]
 
 
 @api.get("/courses", auth=django_auth, response=List[CourseSchema])
+@paginate(CursorPagination)
+def courses(
+    request,
+    filters: CourseFilterSchema = Query(...),
+    search: Optional[str] = None,
+    search_mode: Literal["fulltext", "trigram"] = "fulltext",
+    ordering: CourseOrdering = "id",
+):
+    return catalog_courses(request.auth, filters, search, search_mode, ordering)
+
+
+@api.get("/courses/facets", response=CourseFacetsSchema, description="Course counts per catalog filter value")
+@cache_response
+def course_facets(request, filters: CourseFilterSchema = Query(...)):
+    return catalog_facets(filters.filter(Course.objects.catalog_visible()))
+
+
+@api.get("/courses/search", response=List[CourseSearchHitSchema], description="Full-text course search with highlights")
+@cache_response
 @paginate
-def courses(request, filters: CourseFilterSchema = Query(default=FilterSchema())):
-    if request.auth:
-        user = User.objects.get(username=request.auth)
-        if user.is_superuser:  # Суперюзерам показываем все курсы
-            qs = Course.objects.all().order_by("id")
-            qs = filters.filter(qs)
-            return qs
+def search_courses(request, q: str):
+    return [
+        {"id": hit.course_id, "rank": hit.rank, "highlight": hit.highlight}
+        for hit in get_search_backend().search(q, qs=Course.objects.catalog_visible())
+    ]
 
-    qs = Course.objects.filter(status="published").order_by("id")
-    qs = filters.filter(qs)
-    qs = [c for c in qs if c.catalog_visibility == "both"]
-    return qs
+
+@api.post("/courses/like", description="Mark course as liked")
+def like_course(request, payload: LikedCourseIn):
+    liked = LikedCourse.create(
+        username=payload.dict()["username"], course_id=payload.dict()["course_id"]
+    )
+    return {"success": bool(liked)}
+
+
+@api.get("/courses/likes", auth=django_auth, description="List liked courses")
+def liked_course(request):
+    return get_user_courses_summary(request.auth).liked_course_ids
 
 
+@api.post("/courses/likes", auth=django_auth, description="Like and unlike several courses at once")
+def update_liked_courses(request, payload: LikedCoursesIn):
+    liked = LikedCourse.like(request.auth, payload.like) if payload.like else []
+    unliked = LikedCourse.unlike(request.auth, payload.unlike) if payload.unlike else 0
+    return {"liked": liked, "unliked": unliked}
+
+
+# registered after the literal /courses/... paths: URL patterns are matched in registration order
 @api.get("/courses/{str:id}", response=CourseSchema)
+@cache_response
 def get_course(request, id: str):
-    if id.isnumeric():
-        course = get_object_or_404(Course, id=id)
-    else:
-        course = get_object_or_404(Course, slug=id)
-    return course
+    return course_detail(id)
 
 
 @api.post("/enroll", description="Зачисляет пользователя на программу или проект")
@@ -188,15 +388,11 @@ def enroll_user_to_program(request, payload: ProgramEnrollmentIn):
     }
 
 
-@api.post("/courses/like", description="Mark course as liked")
-def like_course(request, payload: LikedCourseIn):
-    liked = LikedCourse.create(
-        username=payload.dict()["username"], course_id=payload.dict()["course_id"]
+@api.post(
+    "/enroll/bulk", auth=django_auth_superuser, response=Dict[str, str],
+    description="Зачисляет пользователей на программу, возвращает статус зачисления каждого",
+)
+def bulk_enroll_users_to_program(request, payload: BulkProgramEnrollmentIn):
+    return ProgramEnrollment.bulk_enroll(
+        payload.program_uuid, payload.project_uuid, [row.dict() for row in payload.enrollments],
     )
-    return {"success": bool(liked)}
-
-
-@api.get("/courses/likes", auth=django_auth, description="List liked courses")
-def liked_course(request):
-    liked_courses = get_liked_courses(request.auth)
-    return liked_courses
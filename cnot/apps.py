@@ -14,7 +14,9 @@ class CnotEdxConfig(AppConfig):
     name = 'cnot'
 
     def ready(self) -> None:
-        pass
+        from .core import signals as core_signals  # pylint: disable=import-outside-toplevel, unused-import
+        from .courses import signals as courses_signals  # pylint: disable=import-outside-toplevel, unused-import
+        from .profiles import signals as profiles_signals  # pylint: disable=import-outside-toplevel, unused-import
 
 
 class CNOTAdminConfig(AdminConfig):
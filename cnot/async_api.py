@@ -0,0 +1,103 @@
+"""
+Async (ASGI) variants of the read-only catalog endpoints.
+
+The views share their data with the sync views in ``cnot.api``. Django 3.2 has no async ORM,
+so querysets are read in ``db_sync_to_async`` and the event loop serves other requests meanwhile.
+Its calls run in a thread pool rather than in the single thread ``sync_to_async`` uses by default,
+so concurrent requests query the database on several connections; the views only read.
+Mount ``async_api.urls`` next to ``api.urls`` and serve it with an ASGI worker.
+"""
+from typing import List, Literal, Optional
+
+from ninja import Query
+from ninja.errors import AuthenticationError
+from ninja.security import SessionAuth
+
+from .api import (
+    CNOTNinjaAPI,
+    CourseFilterSchema,
+    CourseOrdering,
+    ORJSONRenderer,
+    authentication_error,
+    catalog_courses,
+    course_detail,
+    parse_expand,
+    program_detail,
+    published_orgs,
+    published_programs,
+    published_projects,
+)
+from .cache import acache_response
+from .courses.data_api import get_user_courses_summary
+from .pagination import CursorPagination, apaginate
+from .schema import CourseSchema, OrganizationSchema, ProgramSchema, ProjectSchema
+from .serialization import ProgramsWithCourses
+from .utils import db_sync_to_async
+
+
+class AsyncSessionAuth(SessionAuth):
+    """
+    ``django_auth`` for async views: the session and the user are loaded in ``db_sync_to_async``.
+    """
+
+    async def __call__(self, request):
+        return await db_sync_to_async(super().__call__)(request)
+
+
+async_django_auth = AsyncSessionAuth()
+
+async_api = CNOTNinjaAPI(renderer=ORJSONRenderer(), csrf=True, urls_namespace="cnot-async")
+# anonymous users get the public course catalog, as from the sync API
+async_api.add_exception_handler(AuthenticationError, authentication_error)
+
+
+@async_api.get("/orgs", response=List[OrganizationSchema])
+@acache_response
+@apaginate(CursorPagination)
+async def orgs(request):
+    return published_orgs()
+
+
+@async_api.get("/projects", response=List[ProjectSchema])
+@acache_response
+@apaginate(CursorPagination, ordering=("modified", "pk"))
+async def projects(request, expand: str = ""):
+    return published_projects(parse_expand(expand))
+
+
+@async_api.get("/programs", response=List[ProgramSchema])
+@acache_response
+@apaginate(CursorPagination, ordering=("modified", "pk"))
+async def programs(request, expand: str = ""):
+    return ProgramsWithCourses(published_programs(), parse_expand(expand))
+
+
+@async_api.get("/programs/{str:id}", response=ProgramSchema)
+@acache_response
+async def get_program(request, id: str, expand: str = "courses"):
+    return await db_sync_to_async(program_detail)(id, parse_expand(expand))
+
+
+@async_api.get("/courses", auth=async_django_auth, response=List[CourseSchema])
+@apaginate(CursorPagination)
+async def courses(
+    request,
+    filters: CourseFilterSchema = Query(...),
+    search: Optional[str] = None,
+    search_mode: Literal["fulltext", "trigram"] = "fulltext",
+    ordering: CourseOrdering = "id",
+):
+    # search backends may read their index while building the queryset
+    return await db_sync_to_async(catalog_courses)(request.auth, filters, search, search_mode, ordering)
+
+
+@async_api.get("/courses/likes", auth=async_django_auth, description="List liked courses")
+async def liked_course(request):
+    summary = await db_sync_to_async(get_user_courses_summary)(request.auth)
+    return summary.liked_course_ids
+
+
+@async_api.get("/courses/{str:id}", response=CourseSchema)
+@acache_response
+async def get_course(request, id: str):
+    return await db_sync_to_async(course_detail)(id)
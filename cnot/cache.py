@@ -0,0 +1,206 @@
+"""
+Cache of rendered responses of public read-only API endpoints.
+
+Rendered JSON bytes are stored per request path and query string together with
+a strong ETag. Any change of catalog data invalidates the whole cache
+(see ``cnot.core.signals``).
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from .utils import db_sync_to_async
+
+log = logging.getLogger(__name__)
+
+CACHE_KEY_ATTR = "_cnot_response_cache_key"
+# Seconds a response is cached for, unless ``CNOT_RESPONSE_CACHE_TIMEOUT`` is set
+DEFAULT_TIMEOUT = 300
+
+
+class LocMemResponseCache:
+    """
+    Per-process LRU cache. Invalidation reaches only the current process, so other
+    workers serve stale responses until ``timeout`` expires; use ``DjangoResponseCache``
+    for several workers.
+    """
+
+    def __init__(self, max_entries=1024, timeout=None):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._version = 1
+        self._lock = threading.Lock()
+
+    def versioned_key(self, key):
+        return f"{self._version}:{key}"
+
+    def get(self, key) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            content, etag, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return content, etag
+
+    def set(self, key, content, etag):
+        expires = time.monotonic() + self.timeout if self.timeout is not None else None
+        with self._lock:
+            self._entries[key] = (content, etag, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+
+class DjangoResponseCache:
+    """
+    Cache stored in a Django cache backend. Invalidation bumps a version
+    number, so it is shared by all workers using the same backend.
+
+    ``get`` and ``set`` take keys of ``versioned_key``, so a response rendered while the cache
+    is invalidated is stored under the former version and never served.
+    """
+
+    version_key = "cnot:response-cache:version"
+
+    def __init__(self, alias="default", timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def versioned_key(self, key):
+        version = self.cache.get_or_set(self.version_key, 1, timeout=None)
+        return f"cnot:response-cache:{version}:{key}"
+
+    def get(self, key) -> Optional[Tuple[bytes, str]]:
+        return self.cache.get(key)
+
+    def set(self, key, content, etag):
+        self.cache.set(key, (content, etag), timeout=self.timeout)
+
+    def clear(self):
+        try:
+            self.cache.incr(self.version_key)
+        except ValueError:
+            self.cache.set(self.version_key, 1, timeout=None)
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    """
+    Backend configured by ``CNOT_RESPONSE_CACHE_ALIAS``: a Django cache alias (``"default"``),
+    or None for local memory. Entries expire after ``CNOT_RESPONSE_CACHE_TIMEOUT`` seconds.
+    """
+    global _response_cache  # pylint: disable=global-statement
+    if _response_cache is None:
+        alias = getattr(settings, "CNOT_RESPONSE_CACHE_ALIAS", "default")
+        timeout = getattr(settings, "CNOT_RESPONSE_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+        if alias:
+            _response_cache = DjangoResponseCache(alias, timeout)
+        else:
+            _response_cache = LocMemResponseCache(timeout=timeout)
+    return _response_cache
+
+
+def invalidate_response_cache():
+    get_response_cache().clear()
+
+
+def make_etag(content):
+    return '"{}"'.format(hashlib.sha256(content).hexdigest()[:32])
+
+
+def _request_key(request):
+    params = sorted(request.GET.lists())
+    return "{}?{}".format(request.path, "&".join(f"{k}={','.join(v)}" for k, v in params))
+
+
+def _cached_response(request):
+    """
+    Cached response to ``request``, or None after marking the request for ``store_response``.
+
+    The request is marked with the key of the current cache version: if the cache is invalidated
+    while the view renders, ``store_response`` stores the response under the former version.
+    """
+    cache = get_response_cache()
+    key = cache.versioned_key(_request_key(request))
+    entry = cache.get(key)
+    if entry is None:
+        setattr(request, CACHE_KEY_ATTR, key)
+        return None
+
+    content, etag = entry
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type="application/json; charset=utf-8")
+    response["ETag"] = etag
+    return response
+
+
+def cache_response(func):
+    """
+    Serve the view from the response cache, answering 304 to a matching ``If-None-Match``.
+
+    On a miss the view runs as usual and the rendered content is stored by ``store_response``.
+    """
+
+    @wraps(func)
+    def view_with_cache(request, *args, **kwargs):
+        response = _cached_response(request)
+        if response is None:
+            return func(request, *args, **kwargs)
+        return response
+
+    return view_with_cache
+
+
+def acache_response(func):
+    """
+    ``cache_response`` for async views.
+    """
+
+    @wraps(func)
+    async def view_with_cache(request, *args, **kwargs):
+        response = await db_sync_to_async(_cached_response)(request)
+        if response is None:
+            return await func(request, *args, **kwargs)
+        return response
+
+    return view_with_cache
+
+
+def store_response(request, response):
+    """
+    Store a successful response of a ``cache_response`` view and set its ETag.
+    """
+    key = getattr(request, CACHE_KEY_ATTR, None)
+    if key is None or response.status_code != 200:
+        return response
+    etag = make_etag(response.content)
+    get_response_cache().set(key, response.content, etag)
+    response["ETag"] = etag
+    return response
@@ -85,8 +85,12 @@ class OperationStatuses(
     Valid program enrollment operation statuses.
     Combines error statuses and OK statuses.
     """
+
+    # No user has the supplied username or email.
+    NOT_FOUND = "not-found"
+
     __OK__ = EnrollmentStatuses.__ALL__
-    __ERRORS__ = _EnrollmentErrorStatuses.__ALL__
+    __ERRORS__ = (NOT_FOUND,) + _EnrollmentErrorStatuses.__ALL__
     __ALL__ = __OK__ + __ERRORS__
 
 
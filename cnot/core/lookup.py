@@ -0,0 +1,160 @@
+"""
+Lookup of published programs, projects and organizations by slug, uuid or short name.
+
+Found objects are kept in a per-process LRU cache under the identifier they were looked up
+by. Saving or deleting any of them bumps a version number stored in a shared Django cache
+(see ``cnot.core.signals``), which clears the caches of all workers. Entries also expire after
+``CNOT_LOOKUP_CACHE_TIMEOUT`` seconds, which bounds staleness after queryset ``update()`` calls
+that send no signals.
+"""
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from .models import Organization, Program, Project
+
+LOOKUP_FIELDS = ('slug', 'uuid', 'short_name')
+# Relations read by the detail endpoints, joined by the lookup query
+SELECT_RELATED = {
+    Organization: (),
+    Project: ('owner',),
+    Program: ('owner',),
+}
+# Seconds a looked up object is cached for, unless ``CNOT_LOOKUP_CACHE_TIMEOUT`` is set
+DEFAULT_TIMEOUT = 60
+
+
+class LookupCache:
+    """
+    Per-process LRU cache of looked up objects. Callers get deep copies, so they may annotate
+    them and their related objects.
+
+    Entries are dropped when the version stored under ``version_key`` in the Django cache
+    ``alias`` changes, so ``clear`` in one worker clears all of them, and after ``timeout`` seconds.
+    Callers read the ``version`` before the database and pass it to ``set``, which skips objects
+    read while the cache was invalidated.
+    """
+
+    version_key = 'cnot:lookup-cache:version'
+
+    def __init__(self, max_entries=1024, timeout=None, alias=None):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.alias = alias
+        self._entries = OrderedDict()
+        self._version = None
+        # version of a cache without ``alias``, bumped by ``clear``
+        self._local_version = 1
+        self._lock = threading.Lock()
+
+    def version(self):
+        if not self.alias:
+            return self._local_version
+        return caches[self.alias].get_or_set(self.version_key, 1, timeout=None)
+
+    def get(self, model, identifier, version=None):
+        if version is None:
+            version = self.version()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get((model, identifier))
+            if entry is None:
+                return None
+            obj, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[(model, identifier)]
+                return None
+            self._entries.move_to_end((model, identifier))
+        return copy.deepcopy(obj)
+
+    def set(self, model, identifier, obj, version):
+        if self.version() != version:
+            # invalidated since ``obj`` was read
+            return
+        expires = time.monotonic() + self.timeout if self.timeout is not None else None
+        obj = copy.deepcopy(obj)
+        with self._lock:
+            self._entries[(model, identifier)] = (obj, expires)
+            self._entries.move_to_end((model, identifier))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        if self.alias:
+            cache = caches[self.alias]
+            try:
+                cache.incr(self.version_key)
+            except ValueError:
+                cache.set(self.version_key, 1, timeout=None)
+        with self._lock:
+            self._local_version += 1
+            self._entries.clear()
+
+
+_lookup_cache = None
+
+
+def get_lookup_cache():
+    """
+    ``LookupCache`` versioned in the Django cache ``CNOT_LOOKUP_CACHE_ALIAS`` (``"default"``;
+    None keeps invalidation per process). Entries expire after ``CNOT_LOOKUP_CACHE_TIMEOUT`` seconds.
+    """
+    global _lookup_cache  # pylint: disable=global-statement
+    if _lookup_cache is None:
+        _lookup_cache = LookupCache(
+            timeout=getattr(settings, 'CNOT_LOOKUP_CACHE_TIMEOUT', DEFAULT_TIMEOUT),
+            alias=getattr(settings, 'CNOT_LOOKUP_CACHE_ALIAS', 'default'),
+        )
+    return _lookup_cache
+
+
+def identifier_values(identifier):
+    """
+    Values of ``LOOKUP_FIELDS`` an object identified by ``identifier`` would have.
+    """
+    values = {'slug': identifier, 'short_name': identifier}
+    try:
+        values['uuid'] = uuid.UUID(identifier)
+    except ValueError:
+        pass
+    return values
+
+
+def lookup_published(model, identifier):
+    """
+    Active published ``Organization``, ``Project`` or ``Program`` by slug, uuid or short name, or None.
+
+    An identifier matching several objects resolves in the order of ``LOOKUP_FIELDS``.
+    Misses run a single query; hits run none, reading only the version of the shared cache.
+    """
+    cache = get_lookup_cache()
+    version = cache.version()
+    obj = cache.get(model, identifier, version)
+    if obj is not None:
+        return obj
+
+    values = identifier_values(identifier)
+    q = Q()
+    for field, value in values.items():
+        q |= Q(**{field: value})
+    candidates = list(
+        model.objects.filter(q, active=True, status='published').select_related(*SELECT_RELATED[model])
+    )
+    for field in LOOKUP_FIELDS:
+        for candidate in candidates:
+            if field in values and getattr(candidate, field) == values[field]:
+                cache.set(model, identifier, candidate, version)
+                return candidate
+    return None
+
+
+def invalidate_lookup_cache():
+    get_lookup_cache().clear()
@@ -169,10 +169,10 @@ class Program(TimeStampedModel, SoftDeletableModel):
 
     @classmethod
     def get_program(cls, slug):
-        if cls.objects.select_related().filter(slug=slug).exists():
-            return cls.objects.select_related().filter(slug=slug).first()
-        else:
-            return None
+        """
+        Program by slug, or None. See ``cnot.core.lookup`` for cached lookups of published programs.
+        """
+        return cls.objects.select_related('owner', 'project', 'direction').filter(slug=slug).first()
 
     def export_students(self):
         """TODO: implement method from admin"""
@@ -246,19 +246,34 @@ class ExternalPlatform(TimeStampedModel):
 
     title = models.CharField(_('Название'), blank=False, null=False, max_length=255)
     sources_list_url = models.URLField(blank=True, null=True)
+    feed_etag = models.CharField(max_length=255, blank=True, default='')
+    feed_last_modified = models.CharField(max_length=64, blank=True, default='')
+    synced_at = models.DateTimeField(blank=True, null=True)
     history = HistoricalRecords()
 
     def get_courses(self):
-        # TODO: Implement method
-        response = requests.get(self.sources_list_url, verify=False)
-        ext_courses = response.json()
-        return ext_courses
-        # for course_data in courses:
+        """
+        Iterate over the courses of the platform feed, parsing it as it is downloaded.
+        """
+        from .sync import TIMEOUT, iter_feed  # pylint: disable=import-outside-toplevel
+
+        with requests.get(self.sources_list_url, verify=False, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            yield from iter_feed(response.raw)
 
     def get_course(self, id):
-        ext_courses = self.get_courses()
-        ext_course = [x for x in ext_courses if str(x['id']) == str(id)][0]
-        return ext_course
+        for ext_course in self.get_courses():
+            if str(ext_course['id']) == str(id):
+                return ext_course
+        raise KeyError(id)
 
     def assimilate(self, ext_course):
-        return Course.create_or_update_external(ext_course)
+        """
+        Create or update the course of ``ext_course`` and return it, even if it was removed.
+        """
+        from .sync import upsert_external_courses  # pylint: disable=import-outside-toplevel
+
+        upsert_external_courses(self, [ext_course])
+        # removed courses are updated but stay removed, see Course.bulk_upsert_external
+        return Course.all_objects.get(external_platform=self, external_id=str(ext_course['id']))
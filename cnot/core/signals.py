@@ -0,0 +1,37 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from cnot.cache import invalidate_response_cache
+from cnot.courses.models import Course
+from .lookup import invalidate_lookup_cache
+from .models import Organization, Program, ProgramCourse, Project
+
+log = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Program)
+@receiver(post_save, sender=ProgramCourse)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Organization)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Program)
+@receiver(post_delete, sender=ProgramCourse)
+@receiver(post_delete, sender=Course)
+@receiver(m2m_changed, sender=Program.courses.through)
+def invalidate_catalog_responses(sender, **kwargs):
+    transaction.on_commit(invalidate_response_cache)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Organization)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Program)
+def invalidate_published_lookups(sender, **kwargs):
+    transaction.on_commit(invalidate_lookup_cache)
@@ -0,0 +1,171 @@
+"""
+Incremental synchronization of external platform feeds into external ``Course`` rows.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from queue import Full, Queue
+
+import ijson
+import requests
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from cnot.courses.models import Course
+from .models import ExternalPlatform
+
+log = logging.getLogger(__name__)
+
+MAX_WORKERS = 4
+TIMEOUT = 30
+# Feed courses parsed and written at once; bounds memory regardless of the feed size
+BATCH_SIZE = 500
+# Parsed batches a download may run ahead of the database writes
+QUEUE_SIZE = 2
+
+
+def make_session(pool_size=MAX_WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def open_feed(session, platform):
+    """
+    Start downloading the platform feed with a conditional GET.
+
+    Returns a streamed response, or None if the feed has not changed.
+    """
+    headers = {}
+    if platform.feed_etag:
+        headers['If-None-Match'] = platform.feed_etag
+    if platform.feed_last_modified:
+        headers['If-Modified-Since'] = platform.feed_last_modified
+    response = session.get(platform.sources_list_url, headers=headers, timeout=TIMEOUT, verify=False, stream=True)
+    if response.status_code == 304:
+        response.close()
+        return None
+    response.raise_for_status()
+    # let urllib3 undo gzip/deflate while the parser reads the raw stream
+    response.raw.decode_content = True
+    return response
+
+
+def iter_feed(stream):
+    """
+    Yield courses of a JSON array feed one by one without loading the whole document.
+    """
+    return ijson.items(stream, 'item', use_float=True)
+
+
+def iter_batches(items, batch_size=BATCH_SIZE):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def upsert_external_courses(platform, ext_courses):
+    """
+    Write feed courses that are new or whose content hash changed. Returns counters.
+    """
+    return Course.bulk_upsert_external(ext_courses, platform=platform)
+
+
+def _download(session, platform, out, batch_size, cancelled):
+    """
+    Stream the feed of ``platform`` into the ``out`` queue as batches of courses.
+
+    Puts ``('batch', courses)`` items followed by ``('done', etag, last_modified)``,
+    ``('not_modified',)`` or ``('error', exception)``. Stops once ``cancelled`` is set.
+    """
+
+    def put(message):
+        while not cancelled.is_set():
+            try:
+                out.put(message, timeout=1)
+                return
+            except Full:
+                pass
+        raise InterruptedError('Synchronization cancelled')
+
+    try:
+        response = open_feed(session, platform)
+        if response is None:
+            put(('not_modified',))
+            return
+        with response:
+            for batch in iter_batches(iter_feed(response.raw), batch_size):
+                put(('batch', batch))
+        put(('done', response.headers.get('ETag', ''), response.headers.get('Last-Modified', '')))
+    except InterruptedError:
+        pass
+    except Exception as exc:  # pylint: disable=broad-except
+        put(('error', exc))
+
+
+def _consume(platform, out, cancelled):
+    """
+    Upsert course batches of ``platform`` from the queue until its download ends.
+
+    A failing write cancels the download of this platform only and is reported as its ``error``.
+    """
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0}
+    while True:
+        message = out.get()
+        if message[0] == 'batch':
+            try:
+                counters = upsert_external_courses(platform, message[1])
+            except Exception as exc:  # pylint: disable=broad-except
+                log.exception(f'Cannot write courses of {platform}')
+                cancelled.set()
+                return dict(stats, error=str(exc))
+            for name, count in counters.items():
+                stats[name] += count
+        elif message[0] == 'not_modified':
+            return {'not_modified': True}
+        elif message[0] == 'error':
+            log.error(f'Cannot sync courses of {platform}: {message[1]}')
+            return dict(stats, error=str(message[1]))
+        else:
+            # queryset update keeps platform history free of sync bookkeeping
+            ExternalPlatform.objects.filter(pk=platform.pk).update(
+                feed_etag=message[1], feed_last_modified=message[2], synced_at=timezone.now(),
+            )
+            return stats
+
+
+def sync_external_platforms(platforms=None, max_workers=MAX_WORKERS, batch_size=BATCH_SIZE):
+    """
+    Fetch the feeds of ``platforms`` (all platforms by default) concurrently and upsert changed courses.
+
+    Feeds are parsed incrementally and written in batches of ``batch_size`` courses.
+    Returns ``{platform pk: counters}``; unchanged feeds are reported as ``{'not_modified': True}``,
+    and a platform whose download or write failed has an ``error`` and does not stop the others.
+    """
+    platforms = list(platforms if platforms is not None else ExternalPlatform.objects.exclude(sources_list_url=None))
+    session = make_session(max_workers)
+    results = {}
+
+    # Downloads and parsing run in the pool, database writes happen in this thread.
+    # Platforms are consumed in submission order, so a running download is always drained.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        queues = []
+        for platform in platforms:
+            out, cancelled = Queue(maxsize=QUEUE_SIZE), threading.Event()
+            executor.submit(_download, session, platform, out, batch_size, cancelled)
+            queues.append((platform, out, cancelled))
+
+        try:
+            for platform, out, cancelled in queues:
+                results[platform.pk] = _consume(platform, out, cancelled)
+        except BaseException:
+            for _platform, _out, cancelled in queues:
+                cancelled.set()
+            raise
+    return results
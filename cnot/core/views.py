@@ -20,6 +20,7 @@ class GetExternalCourses(View):
         external_course_id = request.POST.get("external_course_id", None)
         external_platform_id = request.POST.get("external_platform_id", None)
         external_platform = ExternalPlatform.objects.get(pk=external_platform_id)
+        # refreshed from the feed even if already synced; unchanged courses are not written
         external_course = external_platform.get_course(external_course_id)
 
         return HttpResponse(external_platform.assimilate(external_course))
@@ -0,0 +1,73 @@
+"""
+Cache of course "about" attributes, such as ``description``, read from the modulestore.
+
+``CourseDetails.fetch_about_attribute`` reads the modulestore on every call. Values are stored
+in ``CourseAboutAttribute`` rows together with the course version, so they survive restarts,
+and are loaded for a whole page of courses in one query.
+"""
+from django.db import transaction
+from openedx.core.djangoapps.models.course_details import CourseDetails
+
+from .models import CourseAboutAttribute
+
+# Attributes loaded on a course overview, by name
+ATTRIBUTES_ATTR = '_cnot_about_attributes'
+
+
+def course_version(overview):
+    """
+    Version of the course content. ``CourseOverview`` is rebuilt whenever the course is published.
+    """
+    return overview.modified.isoformat() if overview.modified else ''
+
+
+def load_about_attributes(overviews, name='description'):
+    """
+    Load the attribute ``name`` of ``overviews`` and return ``{course key: value}``.
+
+    Cached values of the current course versions are read in one query. Missing and outdated
+    ones are fetched from the modulestore and stored. Values are also kept on the overviews
+    for ``get_about_attribute``.
+    """
+    overviews = {overview.id: overview for overview in overviews}
+    if not overviews:
+        return {}
+
+    values = {}
+    cached = CourseAboutAttribute.objects.filter(course_key__in=list(overviews), name=name)
+    for course_key, value, version in cached.values_list('course_key', 'value', 'version'):
+        if version == course_version(overviews[course_key]):
+            values[course_key] = value
+
+    missing = [course_key for course_key in overviews if course_key not in values]
+    if missing:
+        fetched = {
+            course_key: CourseDetails.fetch_about_attribute(course_key, name) or '' for course_key in missing
+        }
+        with transaction.atomic():
+            CourseAboutAttribute.objects.filter(course_key__in=missing, name=name).delete()
+            CourseAboutAttribute.objects.bulk_create([
+                CourseAboutAttribute(
+                    course_key=course_key, name=name, value=value, version=course_version(overviews[course_key]),
+                )
+                for course_key, value in fetched.items()
+            ], ignore_conflicts=True)
+        values.update(fetched)
+
+    for course_key, overview in overviews.items():
+        overview.__dict__.setdefault(ATTRIBUTES_ATTR, {})[name] = values[course_key]
+    return values
+
+
+def get_about_attribute(overview, name='description'):
+    """
+    Attribute ``name`` of ``overview``, loaded by ``load_about_attributes`` or on demand.
+    """
+    loaded = overview.__dict__.get(ATTRIBUTES_ATTR, {})
+    if name not in loaded:
+        load_about_attributes([overview], name)
+    return overview.__dict__[ATTRIBUTES_ATTR][name]
+
+
+def invalidate_about_attributes(course_key):
+    CourseAboutAttribute.objects.filter(course_key=course_key).delete()
@@ -0,0 +1,173 @@
+"""
+Denormalized course catalog: prebuilt ``CourseSchema`` payloads stored in ``CourseCatalogEntry``
+and search documents stored in ``CourseSearchDocument``.
+"""
+import logging
+
+import orjson
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils.timezone import utc
+
+from cnot.cache import invalidate_response_cache
+from .models import Course, CourseCatalogEntry, CourseSearchDocument
+from .search import build_search_document, get_search_backend
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+
+def build_payload(course):
+    """
+    Serialize ``course`` with ``CourseSchema`` to a JSON-compatible dict.
+    """
+    from cnot.schema import CourseSchema  # pylint: disable=import-outside-toplevel
+
+    data = CourseSchema.from_orm(course).dict()
+    return orjson.loads(orjson.dumps(data, default=str))
+
+
+def build_entry(course):
+    """
+    Catalog entry of ``course`` with its payload and filter values.
+    """
+    return CourseCatalogEntry(
+        course=course,
+        payload=build_payload(course),
+        language=course.language or '',
+        organization=course.organization or '',
+        start_date=course.start_date,
+    )
+
+
+# Duration facet buckets: (shortest, longest or None, key), weeks
+DURATION_BUCKETS = ((0, 4, '0-4'), (5, 8, '5-8'), (9, 16, '9-16'), (17, None, '17+'))
+
+
+def facet_counts(qs, value):
+    """
+    ``{value: number of courses}`` of ``qs`` grouped by the ``value`` expression in one aggregate query.
+    """
+    rows = qs.order_by().annotate(facet=value).values('facet').annotate(count=Count('id', distinct=True))
+    return {row['facet']: row['count'] for row in rows if row['facet'] not in (None, '')}
+
+
+def catalog_facets(qs):
+    """
+    Count courses of ``qs`` per value of every catalog filter, one aggregate query per facet.
+
+    Courses are counted by their longest duration, by labor in credits and by start month.
+    """
+    weeks = Case(When(max_duration__gt=0, then=F('max_duration')), default=F('min_duration'))
+    duration = Case(
+        *(When(weeks__lte=longest, then=Value(key)) for _shortest, longest, key in DURATION_BUCKETS if longest),
+        default=Value(DURATION_BUCKETS[-1][2]),
+        output_field=CharField(),
+    )
+    programs = qs.filter(program__active=True, program__status='published', program__is_removed=False)
+
+    def flag(counts):
+        return {str(value).lower(): count for value, count in counts.items()}
+
+    return {
+        'total': qs.order_by().count(),
+        'language': facet_counts(qs, F('catalog_entry__language')),
+        'organization': facet_counts(qs, F('catalog_entry__organization')),
+        'duration': facet_counts(qs.filter(min_duration__gt=0).annotate(weeks=weeks), duration),
+        'labor': {str(labor): count for labor, count in facet_counts(qs, F('labor')).items()},
+        'external': flag(facet_counts(qs, F('external'))),
+        'enrollment_allowed': flag(facet_counts(qs, F('enrollment_allowed'))),
+        'program': facet_counts(programs, F('program__slug')),
+        'start_month': {
+            month.strftime('%Y-%m'): count
+            for month, count in facet_counts(qs, TruncMonth('catalog_entry__start_date', tzinfo=utc)).items()
+        },
+    }
+
+
+def build_payloads(course_ids):
+    """
+    Payloads of ``course_ids`` built from the courses, for courses that have no catalog entry yet
+    (e.g. before ``rebuild_course_catalog`` has run after deploy). Courses that fail to serialize are skipped.
+    """
+    payloads = {}
+    for course in Course.objects.with_catalog_data().filter(id__in=course_ids):
+        try:
+            payloads[course.id] = build_payload(course)
+        except Exception:  # pylint: disable=broad-except
+            log.exception(f'Cannot build catalog payload for course {course.id}')
+    return payloads
+
+
+def build_brief_payloads(course_ids):
+    """
+    ``CourseBriefSchema`` payloads of ``course_ids``, for courses whose full payload cannot be built,
+    so a page of payloads keeps one item per course.
+    """
+    from cnot.schema import CourseBriefSchema  # pylint: disable=import-outside-toplevel
+
+    return {
+        course.id: orjson.loads(orjson.dumps(CourseBriefSchema.from_orm(course).dict(), default=str))
+        for course in Course.all_objects.select_related('course_overview').filter(id__in=course_ids)
+    }
+
+
+def rebuild_catalog_entries(course_ids=None, chunk_size=CHUNK_SIZE):
+    """
+    Rebuild catalog entries and search documents of the given courses, or of the whole catalog
+    if ``course_ids`` is None.
+
+    Entries of removed courses are deleted. Every chunk is written in its own transaction with
+    the rows of its courses locked, so concurrent rebuilds of a course wait for each other
+    instead of failing on the primary key of its entry. Returns the number of entries written.
+    """
+    backend = get_search_backend()
+    qs = Course.objects.order_by('id')
+    removed = Course.all_objects.filter(is_removed=True)
+    if course_ids is not None:
+        course_ids = set(course_ids)
+        qs = qs.filter(id__in=course_ids)
+        removed = removed.filter(id__in=course_ids)
+    ids = list(qs.values_list('id', flat=True))
+
+    with transaction.atomic():
+        removed_ids = list(removed.values_list('id', flat=True))
+        for model in (CourseCatalogEntry, CourseSearchDocument):
+            model.objects.filter(course_id__in=removed_ids).delete()
+        backend.remove(removed_ids)
+
+    written = 0
+    # prefetch_related is ignored by QuerySet.iterator(), so courses are loaded chunk by chunk
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        with transaction.atomic():
+            list(Course.all_objects.select_for_update().filter(id__in=chunk).order_by('id').values_list('id'))
+            for model in (CourseCatalogEntry, CourseSearchDocument):
+                model.objects.filter(course_id__in=chunk).delete()
+            backend.remove(chunk)
+
+            entries, documents = [], []
+            for course in Course.objects.with_catalog_data().filter(id__in=chunk):
+                try:
+                    entry = build_entry(course)
+                    document = build_search_document(course)
+                except Exception:  # pylint: disable=broad-except
+                    log.exception(f'Cannot build catalog entry for course {course.id}')
+                    continue
+                entries.append(entry)
+                documents.append(document)
+            written += len(CourseCatalogEntry.objects.bulk_create(entries))
+            backend.update(CourseSearchDocument.objects.bulk_create(documents))
+    invalidate_response_cache()
+    return written
+
+
+def schedule_rebuild(course_ids):
+    """
+    Rebuild catalog entries of ``course_ids`` once the current transaction is committed.
+    """
+    course_ids = [course_id for course_id in course_ids if course_id is not None]
+    if course_ids:
+        transaction.on_commit(lambda: rebuild_catalog_entries(course_ids))
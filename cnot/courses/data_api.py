@@ -1,38 +1,91 @@
 import logging
+import time
 
 from common.djangoapps.student.models import (
     CourseEnrollment
 )
-from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
 
-from .models import LikedCourse
+from cnot.schema import CourseEnrollmentSchema, UserCoursesSummarySchema
+from .models import Course, LikedCourse
 
 log = logging.getLogger(__name__)
 
+SUMMARY_TIMEOUT = 60 * 60
+
 
 def get_course_enrollments(username, include_inactive=False):
-    enrollments = []
+    """
+    Course enrollments of the user with ids of the matching cnot courses, in two queries.
+    """
     qset = CourseEnrollment.objects.filter(
         user__username=username,
-    ).order_by('created')
+    ).select_related('course').order_by('created')
 
     if not include_inactive:
         qset = qset.filter(is_active=True)
 
-    for enrollment in qset:
-        cnot_course = enrollment.course.cnot_course.first()
-        enrollments.append({
-            "id": cnot_course.id if cnot_course else None,
-            'course_id': enrollment.course.id,
-            'display_name': enrollment.course.display_name,
-            'start_date': enrollment.course.start_date,
-            'end_date': enrollment.course.end_date,
-        })
+    enrollments = [enrollment for enrollment in qset if enrollment.course is not None]
+    cnot_course_ids = {}
+    for overview_id, course_id in Course.objects.filter(
+        course_overview_id__in={enrollment.course_id for enrollment in enrollments},
+    ).order_by('id').values_list('course_overview_id', 'id'):
+        cnot_course_ids.setdefault(overview_id, course_id)
+
+    return [
+        CourseEnrollmentSchema(
+            id=cnot_course_ids.get(enrollment.course.id),
+            course_id=str(enrollment.course.id),
+            display_name=enrollment.course.display_name,
+            start_date=enrollment.course.start_date,
+            end_date=enrollment.course.end_date,
+            mode=enrollment.mode,
+            is_active=enrollment.is_active,
+        )
+        for enrollment in enrollments
+    ]
+
+
+def _summary_version(user_id):
+    key = f'cnot:user-courses-version:{user_id}'
+    version = cache.get(key)
+    if version is None:
+        # a fresh version never matches a summary cached before the version key was evicted
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_user_courses_summary(user):
+    """
+    Enrollments (with modes) and liked course ids of the user, cached until they change.
+    """
+    key = f'cnot:user-courses:{user.id}:{_summary_version(user.id)}'
+    data = cache.get(key)
+    if data is not None:
+        return UserCoursesSummarySchema.parse_obj(data)
+
+    summary = UserCoursesSummarySchema(
+        enrollments=get_course_enrollments(user.username, include_inactive=True),
+        liked_course_ids=list(LikedCourse.objects.filter(user=user).values_list('course_id', flat=True)),
+    )
+    cache.set(key, summary.dict(), SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate_user_courses_summary(user_id):
+    key = f'cnot:user-courses-version:{user_id}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
 
-    return enrollments
 
+def schedule_summary_invalidation(user_id):
+    """
+    Invalidate the courses summary of ``user_id`` once the current transaction is committed.
 
-def get_liked_courses(username):
-    return LikedCourse.objects.filter(
-        user=get_user_model().objects.get(username=username)).values_list('course__id',
-                                                                          flat=True)
+    A summary rebuilt by a concurrent request before the commit stays under the old version.
+    """
+    transaction.on_commit(lambda: invalidate_user_courses_summary(user_id))
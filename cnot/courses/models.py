@@ -1,14 +1,21 @@
 """
 Database models for cnot courses module.
 """
+import logging
 import re
+import uuid
 from datetime import datetime
 from typing import List
 from typing import Optional
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField as PostgresSearchVectorField
 from django.db import models
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from model_clone.models import CloneModel
 from model_utils import Choices
@@ -17,9 +24,147 @@ from model_utils.models import (
     SoftDeletableModel,
     StatusField,
     MonitorField)
+from model_utils.managers import SoftDeletableManager, SoftDeletableQuerySet
+from opaque_keys.edx.django.models import CourseKeyField
 from simple_history.models import HistoricalRecords
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
 
-from cnot.utils import rough_search
+from cnot.utils import json_hash, rough_get, rough_search
+
+log = logging.getLogger(__name__)
+
+# Popularity counters of ``CourseStats``, also exposed in the course catalog
+COURSE_COUNTERS = ('likes', 'learning_requests', 'enrollments')
+
+
+class SearchVectorField(PostgresSearchVectorField):
+    """
+    ``tsvector`` column on PostgreSQL. Other databases store it as unused text,
+    so the same schema works for SQLite test runs.
+    """
+
+    def db_type(self, connection):
+        return 'tsvector' if connection.vendor == 'postgresql' else 'text'
+
+
+class CatalogPayloads:
+    """
+    Lazy sequence of catalog payloads with the current popularity counters merged in.
+
+    Counters change far more often than courses, so they are read from ``CourseStats``
+    together with the payloads instead of being stored in them. Slicing runs a single query,
+    and ``filter``/``order_by`` are passed to the queryset, so the sequence is paginated
+    by the database just like a queryset. Payloads of courses without a catalog entry
+    are built from the courses with a few more queries; a course whose payload cannot be
+    built gets its brief payload, so a page has one item per row.
+    """
+
+    def __init__(self, qs):
+        self.qs = qs.values_list(
+            'id', 'catalog_entry__payload', *(f'stats__{name}' for name in COURSE_COUNTERS),
+        )
+
+    @classmethod
+    def _from_values(cls, qs):
+        payloads = cls.__new__(cls)
+        payloads.qs = qs
+        return payloads
+
+    @property
+    def query(self):
+        return self.qs.query
+
+    def filter(self, *args, **kwargs):
+        return self._from_values(self.qs.filter(*args, **kwargs))
+
+    def order_by(self, *fields):
+        return self._from_values(self.qs.order_by(*fields))
+
+    @staticmethod
+    def _merge(rows):
+        from .catalog import build_brief_payloads, build_payloads  # pylint: disable=import-outside-toplevel
+
+        missing = [course_id for course_id, payload, *_counters in rows if payload is None]
+        built = build_payloads(missing) if missing else {}
+        failed = [course_id for course_id in missing if course_id not in built]
+        if failed:
+            log.warning(f'Serving brief catalog payloads of courses {failed}')
+            built.update(build_brief_payloads(failed))
+        payloads = []
+        for course_id, payload, *counters in rows:
+            payload = built[course_id] if payload is None else payload
+            payloads.append({**payload, **{name: value or 0 for name, value in zip(COURSE_COUNTERS, counters)}})
+        return payloads
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._merge(list(self.qs[key]))
+        return self._merge([self.qs[key]])[0]
+
+    def __iter__(self):
+        return iter(self._merge(list(self.qs)))
+
+    def __len__(self):
+        return self.qs.count()
+
+
+class CourseQuerySet(SoftDeletableQuerySet):
+
+    def catalog_visible(self):
+        """
+        Published courses that should be listed in the public catalog.
+
+        Visibility of internal courses is defined by ``CourseOverview.catalog_visibility``
+        and is checked with a join, so the result can still be paginated by the database.
+        External courses have no catalog visibility of their own (``Course.catalog_visibility``
+        is an empty string for them) and are not listed.
+        """
+        return self.filter(
+            status='published',
+            external=False,
+            course_overview__catalog_visibility='both',
+        )
+
+    def catalog_payloads(self):
+        """
+        Prebuilt ``CourseSchema`` payloads of the courses, read from ``CourseCatalogEntry``.
+
+        Filters and ordering of the queryset are kept, so a page of payloads
+        costs a single query. Popularity counters are added to every payload.
+        """
+        return CatalogPayloads(self)
+
+    def order_by_counter(self, ordering):
+        """
+        Order by a popularity counter, e.g. ``'-likes'``. Courses without stats count as zero.
+        """
+        name = ordering.lstrip('-')
+        if name not in COURSE_COUNTERS:
+            raise ValueError(f'Unknown course counter: {name}')
+        value = Coalesce(F(f'stats__{name}'), 0)
+        return self.order_by(value.desc() if ordering.startswith('-') else value.asc(), 'id')
+
+    def with_catalog_data(self):
+        """
+        Load everything ``CourseSchema`` reads from a course in a fixed number of queries.
+
+        ``CourseOverview`` is joined, competences, results and authors are prefetched,
+        and the course properties read them from the prefetch cache.
+        """
+        return self.select_related('course_overview').prefetch_related(
+            Prefetch('result_set', queryset=Result.objects.only('id', 'title', 'order', 'course_id')),
+            Prefetch('competence_set', queryset=Competence.objects.only('id', 'title', 'order', 'course_id')),
+            'authors',
+        )
+
+    def with_catalog_payloads(self):
+        """
+        Join catalog entries and stats, so ``Course.catalog_payload`` is read without queries.
+        """
+        return self.select_related('catalog_entry', 'stats')
+
+
+CourseManager = SoftDeletableManager.from_queryset(CourseQuerySet)
 
 
 class Course(CloneModel, TimeStampedModel, SoftDeletableModel):
@@ -47,7 +192,18 @@ class Course(CloneModel, TimeStampedModel, SoftDeletableModel):
         app_label = 'cnot'
         verbose_name = 'курс'
         verbose_name_plural = 'курсы'
+        unique_together = (
+            ('external_platform', 'external_id'),
+        )
+        # catalog filters, see ``cnot.api.CourseFilterSchema``
+        indexes = [
+            models.Index(fields=['status', 'external', 'enrollment_allowed']),
+            models.Index(fields=['labor']),
+            models.Index(fields=['min_duration', 'max_duration']),
+        ]
         
+    objects = CourseManager()
+
     slug = models.CharField(_("ИД курса"),  max_length=50, unique=True) 
 
     external = models.BooleanField(_('External course'), default=False)
@@ -78,6 +234,10 @@ class Course(CloneModel, TimeStampedModel, SoftDeletableModel):
     display_name_f = models.CharField(_('External display name'), max_length=255, blank=True, null=True)
     organization_f = models.CharField(_('External organization name'), max_length=255, blank=True, null=True)
     external_link = models.URLField(_('External link'), blank=True, null=True)
+    external_platform = models.ForeignKey('ExternalPlatform', related_name='courses', blank=True, null=True,
+                                          on_delete=models.SET_NULL)
+    external_id = models.CharField(_('ID on the external platform'), max_length=255, blank=True, null=True)
+    external_hash = models.CharField(_('Hash of the external course data'), max_length=64, blank=True, default='')
 
     history = HistoricalRecords(excluded_fields=['status', 'published_at'])
     STATUS = Choices('draft', 'published')
@@ -225,11 +385,11 @@ class Course(CloneModel, TimeStampedModel, SoftDeletableModel):
 
     @property
     def results(self) -> List[Optional[str]]:
-        return self.result_set.values_list('title', flat=True)
+        return [result.title for result in self.result_set.all()]
 
     @property
     def competences(self) -> List[Optional[str]]:
-        return self.competence_set.values_list('title', flat=True)
+        return [competence.title for competence in self.competence_set.all()]
 
     @property
     def course_program_html(self) -> str:
@@ -243,68 +403,295 @@ class Course(CloneModel, TimeStampedModel, SoftDeletableModel):
         else:
             return ''
 
+    @property
+    def catalog_payload(self) -> Optional[dict]:
+        """
+        Prebuilt ``CourseSchema`` payload with popularity counters, or None if the course has no catalog entry.
+
+        Load courses with ``select_related('catalog_entry', 'stats')`` to read it without queries.
+        """
+        try:
+            payload = self.catalog_entry.payload
+        except CourseCatalogEntry.DoesNotExist:
+            return None
+        return self.with_counters(payload)
+
+    def with_counters(self, payload) -> dict:
+        """
+        ``payload`` with the popularity counters of the course.
+        """
+        stats = getattr(self, 'stats', None)
+        return {**payload, **{name: getattr(stats, name, 0) for name in COURSE_COUNTERS}}
+
+    @staticmethod
+    def external_fields(ext_course):
+        """
+        Course field values taken from a course of an external platform feed.
+        """
+        dates = rough_get(ext_course, ('startdate', 'enddate'), max_distance=2)
+        return {
+            'display_name_f': rough_search(ext_course, 'display_name'),
+            'target': ext_course.get('target', None),
+            'description': ext_course.get('description', None),
+            'course_program': ext_course.get('course_program', None),
+            'min_duration': ext_course.get('min_duration', 0),
+            'max_duration': ext_course.get('max_duration', None),
+            'labor': ext_course.get('labor', 0),
+            'lectures_count': ext_course.get('lectures_count', 0),
+            'prerequisites': ext_course.get('prerequisites', None),
+            'format': ext_course.get('format', None),
+            'lang': ext_course.get('lang', None),
+            'course_image_url_f': ext_course.get('course_image_url', None),
+            'start_display_f': dates['startdate'],
+            'start_date_f': dates['startdate'],
+            'end_date_f': dates['enddate'],
+        }
+
     @classmethod
     def create_or_update_external(cls, ext_course):
-        display_name = rough_search(ext_course, 'display_name')
-        target = ext_course.get('target', None)
-        description = ext_course.get('description', None)
-        course_program = ext_course.get('course_program', None)
-        min_duration = ext_course.get('min_duration', 0)
-        max_duration = ext_course.get('max_duration', None)
-        labor = ext_course.get('labor', 0)
-        lectures_count = ext_course.get('lectures_count', 0)
-        prerequisites = ext_course.get('prerequisites', None)
-        _format = ext_course.get('format', None)
-        lang = ext_course.get('lang', None)
-        course_image_url_f = ext_course.get('course_image_url', None)
-        start_display_f = ext_course.get('startdate', None)
-        start_date_f = ext_course.get('startdate', None)
-        end_date_f = ext_course.get('enddate', None)
-
-        existing_course = cls.objects.filter(display_name_f=display_name, external=True)
+        fields = cls.external_fields(ext_course)
+
+        existing_course = cls.objects.filter(display_name_f=fields['display_name_f'], external=True)
 
         if existing_course.exists():
             existing_course = existing_course.first()
-            existing_course.display_name_f = display_name
-            existing_course.target = target
-            existing_course.description = description
-            existing_course.course_program = course_program
-            existing_course.min_duration = min_duration
-            existing_course.max_duration = max_duration
-            existing_course.labor = labor
-            existing_course.lectures_count = lectures_count
-            existing_course.prerequisites = prerequisites
-            existing_course.format = _format
-            existing_course.lang = lang
-            existing_course.course_image_url_f = course_image_url_f
-            existing_course.start_display_f = start_display_f
-            existing_course.start_date_f = start_date_f
-            existing_course.end_date_f = end_date_f
+            for name, value in fields.items():
+                setattr(existing_course, name, value)
             existing_course.save()
         else:
-            existing_course = cls.objects.create(display_name_f=display_name,
-                                                 target=target,
-                                                 description=description,
-                                                 course_program=course_program,
-                                                 min_duration=min_duration,
-                                                 max_duration=max_duration,
-                                                 labor=labor,
-                                                 lectures_count=lectures_count,
-                                                 prerequisites=prerequisites,
-                                                 format=_format,
-                                                 lang=lang,
-                                                 course_image_url_f=course_image_url_f,
-                                                 start_display_f=start_display_f,
-                                                 start_date_f=start_date_f,
-                                                 end_date_f=end_date_f,
-                                                 external=True
-                                                 )
+            existing_course = cls.objects.create(external=True, slug=f'ext-{uuid.uuid4().hex[:12]}', **fields)
         return existing_course
 
         """
           create authors; competences; results objects, bind with course
         """
 
+    @classmethod
+    def bulk_upsert_external(cls, ext_courses, platform=None, batch_size=500):
+        """
+        Create or update external courses from feed dicts in a fixed number of queries per chunk.
+
+        With ``platform`` courses are matched by their id on the platform, falling back to
+        the display name for courses assimilated before; without it only by display name.
+        Rows whose feed data hash did not change are skipped, as are (with a warning) rows of
+        a platform feed without an id. History records are written in bulk. Returns counters of created, updated and unchanged courses.
+        """
+        feed = {}
+        without_id = 0
+        for ext_course in ext_courses:
+            fields = cls.external_fields(ext_course)
+            if platform is not None:
+                if ext_course.get('id') is None:
+                    without_id += 1
+                    continue
+                key = str(ext_course['id'])
+            else:
+                key = fields['display_name_f']
+            feed[key] = (fields, json_hash(ext_course))
+        if without_id:
+            log.warning(f'Skipped {without_id} courses without an id in the feed of platform {platform.pk} ({platform})')
+
+        # removed courses are matched too, so they are updated but not recreated
+        external = cls.all_objects.filter(external=True)
+        if platform is not None:
+            existing = {
+                course.external_id: course
+                for course in external.filter(external_platform=platform, external_id__in=feed.keys())
+            }
+            names = {feed[key][0]['display_name_f']: key for key in feed.keys() - existing.keys()}
+            for course in external.filter(external_id__isnull=True, display_name_f__in=names.keys()):
+                existing.setdefault(names[course.display_name_f], course)
+        else:
+            existing = {course.display_name_f: course for course in external.filter(display_name_f__in=feed.keys())}
+
+        now = timezone.now()
+        created, updated = [], []
+        for key, (fields, digest) in feed.items():
+            course = existing.get(key)
+            if course is not None and course.external_hash == digest:
+                continue
+            if course is None:
+                # ids are often long URLs sharing a prefix, so the slug carries a hash of the id
+                if platform is not None:
+                    slug = f'ext-{platform.pk}-{json_hash(key)[:12]}'
+                else:
+                    slug = f'ext-{uuid.uuid4().hex[:12]}'
+                course = cls(external=True, slug=slug, created=now)
+                created.append(course)
+            else:
+                updated.append(course)
+            for name, value in fields.items():
+                setattr(course, name, value)
+            if platform is not None:
+                course.external_platform = platform
+                course.external_id = key
+            course.external_hash = digest
+            course.modified = now
+
+        update_fields = sorted({name for fields, _digest in feed.values() for name in fields}) + [
+            'external_platform', 'external_id', 'external_hash', 'modified',
+        ]
+        with transaction.atomic():
+            bulk_create_with_history(created, cls, batch_size=batch_size, default_date=now)
+            bulk_update_with_history(updated, cls, update_fields, batch_size=batch_size, default_date=now)
+
+        # bulk writes send no post_save, so catalog entries are rebuilt here
+        from .catalog import schedule_rebuild  # pylint: disable=import-outside-toplevel
+        schedule_rebuild(
+            cls.objects.filter(slug__in=[course.slug for course in created + updated]).values_list('id', flat=True)
+        )
+
+        return {'created': len(created), 'updated': len(updated), 'unchanged': len(feed) - len(created) - len(updated)}
+
+
+class CourseCatalogEntry(models.Model):
+    """
+    Готовое представление курса для каталога (payload ``CourseSchema``).
+    Пересобирается сигналами при изменении курса и связанных объектов.
+    """
+    course = models.OneToOneField(Course, primary_key=True, related_name='catalog_entry', on_delete=models.CASCADE)
+    payload = models.JSONField(default=dict)
+    # Значения фильтров каталога, которые у внутренних курсов берутся из CourseOverview
+    language = models.CharField(max_length=32, blank=True, default='', db_index=True)
+    organization = models.CharField(max_length=255, blank=True, default='', db_index=True)
+    start_date = models.DateTimeField(blank=True, null=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'запись каталога'
+        verbose_name_plural = 'записи каталога'
+
+    def __str__(self) -> str:
+        return f'<CourseCatalogEntry, course ID: {self.course_id}>'
+
+
+class CourseSearchDocument(models.Model):
+    """
+    Текст курса для полнотекстового поиска (см. ``cnot.courses.search``).
+    Пересобирается вместе с записью каталога.
+    """
+    course = models.OneToOneField(Course, primary_key=True, related_name='search_document', on_delete=models.CASCADE)
+    title = models.TextField(blank=True, default='')
+    body = models.TextField(blank=True, default='')
+    authors = models.TextField(blank=True, default='')
+    # Название и авторы вместе с транслитерацией, для поиска с опечатками
+    names = models.TextField(blank=True, default='')
+    vector = SearchVectorField(null=True, editable=False)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'поисковый документ курса'
+        verbose_name_plural = 'поисковые документы курсов'
+
+    def __str__(self) -> str:
+        return f'<CourseSearchDocument, course ID: {self.course_id}>'
+
+
+class CourseAboutAttribute(models.Model):
+    """
+    Атрибут страницы «О курсе» из modulestore (например, ``description``), см. ``cnot.courses.about``.
+    Действителен, пока совпадает версия курса; удаляется при публикации курса.
+    """
+    course_key = CourseKeyField(max_length=255)
+    name = models.CharField(max_length=64)
+    value = models.TextField(blank=True, default='')
+    version = models.CharField(max_length=64, blank=True, default='')
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'атрибут описания курса'
+        verbose_name_plural = 'атрибуты описания курсов'
+        unique_together = (
+            ('course_key', 'name'),
+        )
+
+    def __str__(self) -> str:
+        return f'<CourseAboutAttribute, course key: {self.course_key}, name: {self.name}>'
+
+
+class CourseStats(models.Model):
+    """
+    Счетчики популярности курса.
+
+    Обновляются атомарно (``F()``) сигналами лайков, заявок на обучение и записей на курс
+    и периодически сверяются с исходными таблицами командой ``reconcile_course_stats``.
+
+    Counters change with every click, so they do not invalidate cached catalog responses:
+    cached counters are up to ``CNOT_RESPONSE_CACHE_TIMEOUT`` seconds old.
+    """
+    course = models.OneToOneField(Course, primary_key=True, related_name='stats', on_delete=models.CASCADE)
+    likes = models.PositiveIntegerField(default=0)
+    learning_requests = models.PositiveIntegerField(default=0)
+    enrollments = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'статистика курса'
+        verbose_name_plural = 'статистика курсов'
+
+    def __str__(self) -> str:
+        return f'<CourseStats, course ID: {self.course_id}>'
+
+    @classmethod
+    def increment(cls, course_ids, **deltas):
+        """
+        Atomically add ``deltas`` to counters of ``course_ids``, e.g. ``increment([1], likes=1)``.
+
+        Stats rows are created for courses that have none yet.
+        """
+        course_ids = set(course_ids)
+        values = {name: Greatest(F(name) + delta, 0) for name, delta in deltas.items()}
+        updated = cls.objects.filter(course_id__in=course_ids).update(**values)
+        if updated < len(course_ids):
+            missing = list(
+                Course.all_objects.filter(pk__in=course_ids, stats__isnull=True).values_list('pk', flat=True)
+            )
+            if missing:
+                # a concurrent writer may create the same rows, so they start at zero and are updated after
+                cls.objects.bulk_create([cls(course_id=pk) for pk in missing], ignore_conflicts=True)
+                cls.objects.filter(course_id__in=missing).update(**values)
+
+    @classmethod
+    def counter_queries(cls):
+        """
+        Subqueries counting every counter from its source table for ``OuterRef('course_id')``.
+        """
+        from common.djangoapps.student.models import CourseEnrollment
+        from cnot.learners.models import LearningRequest
+
+        def count(qs):
+            return Coalesce(Subquery(qs.order_by().values('course_id').annotate(n=Count('*')).values('n')), 0)
+
+        return {
+            'likes': count(LikedCourse.objects.filter(course_id=OuterRef('course_id'))),
+            'learning_requests': count(LearningRequest.objects.filter(course_id=OuterRef('course_id'))),
+            'enrollments': count(CourseEnrollment.objects.filter(
+                is_active=True,
+                course_id=Subquery(Course.all_objects.filter(pk=OuterRef(OuterRef('course_id'))).values('course_overview_id')),
+            )),
+        }
+
+    @classmethod
+    def reconcile(cls, course_ids=None, counters=COURSE_COUNTERS):
+        """
+        Recount ``counters`` of ``course_ids`` (all courses by default) from the source tables.
+
+        Returns the number of stats rows whose counters were corrected.
+        """
+        courses = Course.all_objects.all()
+        stats = cls.objects.all()
+        if course_ids is not None:
+            courses = courses.filter(pk__in=set(course_ids))
+            stats = stats.filter(course_id__in=set(course_ids))
+        cls.objects.bulk_create(
+            [cls(course_id=pk) for pk in courses.filter(stats__isnull=True).values_list('pk', flat=True)],
+            ignore_conflicts=True,
+        )
+        queries = {name: query for name, query in cls.counter_queries().items() if name in counters}
+        drifted = models.Q()
+        for name, query in queries.items():
+            drifted |= ~models.Q(**{name: query})
+        return stats.filter(drifted).update(**queries)
+
 
 class Competence(models.Model):
     title = models.TextField()
@@ -365,15 +752,65 @@ class Author(models.Model):
 
 
 class LikedCourse(models.Model):
+    """
+    Like of a course by a user.
+
+    ``like`` and ``unlike`` write in bulk without model signals and own the ``likes`` counters
+    and the user's course summary for their writes. Likes saved or deleted one by one (e.g. in
+    the admin) update them through the signal receivers of ``cnot.courses.signals``.
+    """
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
 
+    class Meta:
+        unique_together = (
+            ('user', 'course'),
+        )
+
     def __str__(self) -> str:
         return str(self.user) + str(self.course)
 
     @classmethod
     def create(cls, username, course_id):
-        user = get_user_model().objects.get(username=username)
-        course = Course.objects.get(pk=course_id)
-        obj = cls.objects.create(user=user, course=course)
-        return obj
+        user = get_user_model().objects.only('id').get(username=username)
+        if not cls.like(user, [course_id]):
+            raise Course.DoesNotExist(f'Course {course_id} does not exist')
+        return cls(user=user, course_id=int(course_id))
+
+    @classmethod
+    def like(cls, user, course_ids):
+        """
+        Like courses idempotently; unknown course ids are skipped. Returns ids of the liked courses.
+
+        Bulk writes send no model signals, so the user's course summary is invalidated
+        and like counters of the courses are recounted here.
+        """
+        from .data_api import schedule_summary_invalidation
+
+        course_ids = list(Course.objects.filter(pk__in=set(course_ids)).values_list('pk', flat=True))
+        if course_ids:
+            cls.objects.bulk_create(
+                [cls(user_id=user.pk, course_id=course_id) for course_id in course_ids],
+                ignore_conflicts=True,
+            )
+            CourseStats.reconcile(course_ids, counters=('likes',))
+            schedule_summary_invalidation(user.pk)
+        return course_ids
+
+    @classmethod
+    def unlike(cls, user, course_ids):
+        """
+        Remove likes of courses. Returns the number of removed likes.
+
+        ``QuerySet.delete`` would collect the rows to send ``post_delete`` for each of them, whose
+        receivers update the counters one like at a time. Likes have no dependent rows, so they
+        are deleted with one ``DELETE`` and the counters are recounted here instead.
+        """
+        from .data_api import schedule_summary_invalidation
+
+        qs = cls.objects.filter(user_id=user.pk, course_id__in=set(course_ids))
+        deleted = qs._raw_delete(qs.db)  # pylint: disable=protected-access
+        if deleted:
+            CourseStats.reconcile(course_ids, counters=('likes',))
+            schedule_summary_invalidation(user.pk)
+        return deleted
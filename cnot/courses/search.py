@@ -0,0 +1,473 @@
+"""
+Full-text search over the course catalog.
+
+Every course has a ``CourseSearchDocument`` with its title and the rest of its text
+(target, description, program, competences and results). Documents are rebuilt together
+with catalog entries (see ``cnot.courses.catalog``), so the index follows course, competence
+and result saves incrementally.
+
+Besides full-text search, backends find courses by trigram similarity of their names
+(titles and authors, also transliterated), which tolerates typos and "питон" for "python".
+
+Two backends are available:
+
+* ``PostgresSearchBackend`` keeps a weighted ``tsvector`` per document under a GIN index
+  and a ``pg_trgm`` GIN index of names;
+* ``PythonSearchBackend`` keeps in-process inverted and trigram indexes and is meant for SQLite test runs.
+  Every worker has its own index, reloaded from ``CourseSearchDocument`` once it is older than
+  ``CNOT_SEARCH_INDEX_MAX_AGE`` seconds, so writes of other workers show up within that time.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import List, NamedTuple
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import BooleanField, Case, F, FloatField, Func, IntegerField, Value, When
+from django.db.models.functions import Concat
+from django.utils.html import strip_tags
+from django.utils.module_loading import import_string
+
+from .models import CourseSearchDocument
+
+log = logging.getLogger(__name__)
+
+HIGHLIGHT_START = '<b>'
+HIGHLIGHT_STOP = '</b>'
+
+
+class SearchHit(NamedTuple):
+    course_id: int
+    rank: float
+    highlight: str
+
+
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z', 'и': 'i',
+    'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't',
+    'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '',
+    'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+# Spelling of latin words in russian texts: "python" is written "питон"
+LATIN_TO_CYRILLIC = {
+    'shch': 'щ', 'sh': 'ш', 'ch': 'ч', 'zh': 'ж', 'kh': 'х', 'ts': 'ц', 'th': 'т', 'ph': 'ф', 'ck': 'к',
+    'ya': 'я', 'yu': 'ю', 'ee': 'и', 'oo': 'у', 'a': 'а', 'b': 'б', 'c': 'к', 'd': 'д', 'e': 'е', 'f': 'ф',
+    'g': 'г', 'h': 'х', 'i': 'и', 'j': 'дж', 'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н', 'o': 'о', 'p': 'п',
+    'q': 'к', 'r': 'р', 's': 'с', 't': 'т', 'u': 'у', 'v': 'в', 'w': 'в', 'x': 'кс', 'y': 'и', 'z': 'з',
+}
+
+
+def _transliterator(table):
+    pattern = re.compile('|'.join(sorted(table, key=len, reverse=True)))
+    return lambda text: pattern.sub(lambda match: table[match.group()], text.lower())
+
+
+to_latin = _transliterator(CYRILLIC_TO_LATIN)
+to_cyrillic = _transliterator(LATIN_TO_CYRILLIC)
+
+
+def build_search_document(course):
+    """
+    Collect searchable text of ``course`` loaded with ``Course.objects.with_catalog_data()``.
+    """
+    title = course.display_name or ''
+    authors = ', '.join(author.name for author in course.authors.all())
+    body = [course.target, course.description, course.course_program, *course.competences, *course.results]
+    names = [title, authors, to_latin(title), to_cyrillic(title), to_latin(authors), to_cyrillic(authors)]
+    return CourseSearchDocument(
+        course=course,
+        title=title,
+        body='\n'.join(strip_tags(text) for text in body if text),
+        authors=authors,
+        names='\n'.join(dict.fromkeys(name for name in names if name)),
+    )
+
+
+def order_by_ids(qs, ids):
+    """
+    Restrict ``qs`` to ``ids`` keeping their order.
+    """
+    if not ids:
+        return qs.none()
+    position = Case(*[When(id=course_id, then=Value(i)) for i, course_id in enumerate(ids)],
+                    output_field=IntegerField())
+    return qs.filter(id__in=ids).order_by(position, 'id')
+
+
+class WordSimilar(Func):
+    """
+    ``query <% names`` of ``pg_trgm``: word similarity above ``pg_trgm.word_similarity_threshold``.
+    Unlike a comparison of ``WordSimilarity``, it can use the trigram index of names.
+    """
+    template = '%(expressions)s'
+    arg_joiner = ' <%% '
+    output_field = BooleanField()
+
+
+class WordSimilarity(Func):
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+
+class BaseSearchBackend:
+    """
+    Search backend interface.
+    """
+
+    def update(self, documents):
+        """
+        Index saved ``documents``.
+        """
+
+    def remove(self, course_ids=None):
+        """
+        Drop documents of ``course_ids``, or all documents if it is None, from the index.
+        """
+
+    def filter(self, qs, query):
+        """
+        Restrict a ``Course`` queryset to courses matching ``query``, best matches first.
+        """
+        raise NotImplementedError
+
+    def search(self, query, qs=None, limit=None) -> List[SearchHit]:
+        """
+        Ranked hits with highlighted fragments, optionally restricted to courses of ``qs``.
+        """
+        raise NotImplementedError
+
+    def similar(self, qs, query, limit=None, threshold=None):
+        """
+        Restrict a ``Course`` queryset to at most ``limit`` courses whose names are similar
+        to ``query`` by at least ``threshold``, most similar first.
+        """
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    ``tsvector`` search: titles are weighted above the rest of the text.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or getattr(settings, 'CNOT_SEARCH_CONFIG', 'russian')
+
+    def _query(self, query):
+        from django.contrib.postgres.search import SearchQuery
+
+        return SearchQuery(query, config=self.config, search_type='websearch')
+
+    def update(self, documents):
+        from django.contrib.postgres.search import SearchVector
+
+        CourseSearchDocument.objects.filter(pk__in=[document.pk for document in documents]).update(
+            vector=SearchVector('title', weight='A', config=self.config)
+            + SearchVector('body', weight='B', config=self.config)
+        )
+
+    def filter(self, qs, query):
+        from django.contrib.postgres.search import SearchRank
+
+        query = self._query(query)
+        return qs.filter(search_document__vector=query).annotate(
+            search_rank=SearchRank(F('search_document__vector'), query),
+        ).order_by('-search_rank', 'id')
+
+    def search(self, query, qs=None, limit=None):
+        from django.contrib.postgres.search import SearchHeadline, SearchRank
+
+        query = self._query(query)
+        documents = CourseSearchDocument.objects.filter(vector=query)
+        if qs is not None:
+            documents = documents.filter(course__in=qs.values('id'))
+        documents = documents.annotate(
+            rank=SearchRank(F('vector'), query),
+            highlight=SearchHeadline(
+                Concat('title', Value('\n'), 'body'), query, config=self.config,
+                start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP,
+            ),
+        ).order_by('-rank', 'course_id').values_list('course_id', 'rank', 'highlight')
+        return [SearchHit(*row) for row in documents[:limit or get_search_limit()]]
+
+    def similar(self, qs, query, limit=None, threshold=None):
+        documents = CourseSearchDocument.objects.using(qs.db).filter(
+            WordSimilar(Value(query), F('names')), course__in=qs.values('id'),
+        ).order_by(WordSimilarity(Value(query), F('names')).desc(), 'course_id')
+        with transaction.atomic(using=qs.db), connections[qs.db].cursor() as cursor:
+            # the threshold of "<%" is a setting, local to this transaction
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(threshold or get_trigram_threshold())],
+            )
+            ids = list(documents.values_list('course_id', flat=True)[:limit or get_trigram_limit()])
+        return order_by_ids(qs, ids)
+
+    @staticmethod
+    def create_index(using='default'):
+        """
+        Create GIN indexes of document vectors and names; models of this app have no migrations to hold them.
+        """
+        table = CourseSearchDocument._meta.db_table
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {table}_vector_gin ON {table} USING gin (vector)')
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {table}_names_trgm ON {table} USING gin (names gin_trgm_ops)')
+
+
+WORD_RE = re.compile(r'\w+')
+
+# Endings stripped by ``stem``, longest first. A crude approximation of the Snowball
+# russian stemmer, good enough to match word forms in tests.
+ENDINGS = sorted({
+    'иями', 'ями', 'ами', 'иях', 'ях', 'ах', 'ием', 'ией', 'ой', 'ей', 'ий', 'ый', 'ой', 'ая', 'яя',
+    'ое', 'ее', 'ые', 'ие', 'ых', 'их', 'ым', 'им', 'ом', 'ем', 'ам', 'ям', 'ов', 'ев', 'ую', 'юю',
+    'ия', 'ии', 'ию', 'ья', 'ье', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+    'ing', 'es', 's',
+}, key=len, reverse=True)
+MIN_STEM = 3
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    return [stem(match.group()) for match in WORD_RE.finditer(text)]
+
+
+def trigrams(word):
+    """
+    Trigrams of a lowercased word padded the way ``pg_trgm`` does.
+    """
+    word = f'  {word} '
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def highlight(text, stems, max_words=35):
+    """
+    Fragment of ``text`` around the first matching word with matching words wrapped in ``<b>``.
+    """
+    words = list(WORD_RE.finditer(text))
+    matches = [i for i, word in enumerate(words) if stem(word.group()) in stems]
+    if not matches:
+        return ''
+    first = max(matches[0] - max_words // 3, 0)
+    window = words[first:first + max_words]
+    parts, position = [], window[0].start()
+    for word in window:
+        parts.append(text[position:word.start()])
+        if stem(word.group()) in stems:
+            parts.append(f'{HIGHLIGHT_START}{word.group()}{HIGHLIGHT_STOP}')
+        else:
+            parts.append(word.group())
+        position = word.end()
+    return ' '.join(''.join(parts).split())
+
+
+class PythonSearchBackend(BaseSearchBackend):
+    """
+    In-process inverted index for SQLite test runs.
+
+    The index is loaded from ``CourseSearchDocument`` on first use and then follows
+    ``update``/``remove`` calls of the current process; it is reloaded once it is older
+    than ``max_age`` seconds to pick up writes of other processes. Ranking is TF-IDF with
+    title terms weighted above body terms; all query words must match.
+
+    Similarity of names is the average over query words of the best trigram similarity
+    (as ``pg_trgm.similarity``) to a word of the names.
+    """
+
+    TITLE_WEIGHT = 1.0
+    BODY_WEIGHT = 0.4
+
+    def __init__(self, max_age=None):
+        self.max_age = get_search_index_max_age() if max_age is None else max_age
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._documents = None
+        self._loaded_at = None
+        self._postings = defaultdict(dict)
+        self._words = defaultdict(set)
+        self._trigrams = defaultdict(set)
+
+    def _index(self, course_id, title, body, names=''):
+        self._documents[course_id] = (title, body, names)
+        for word in set(WORD_RE.findall(names.lower())):
+            if not self._words[word]:
+                for gram in trigrams(word):
+                    self._trigrams[gram].add(word)
+            self._words[word].add(course_id)
+        weights = defaultdict(float)
+        for token in tokenize(title):
+            weights[token] += self.TITLE_WEIGHT
+        for token in tokenize(body):
+            weights[token] += self.BODY_WEIGHT
+        for token, weight in weights.items():
+            self._postings[token][course_id] = weight
+
+    def _unindex(self, course_id):
+        title, body, names = self._documents.pop(course_id)
+        for word in set(WORD_RE.findall(names.lower())):
+            self._words[word].discard(course_id)
+            if not self._words[word]:
+                del self._words[word]
+                for gram in trigrams(word):
+                    self._trigrams[gram].discard(word)
+        for token in set(tokenize(title)) | set(tokenize(body)):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(course_id, None)
+                if not postings:
+                    del self._postings[token]
+
+    def _load(self):
+        if self._documents is not None and time.monotonic() - self._loaded_at >= self.max_age:
+            self._reset()
+        if self._documents is None:
+            self._documents = {}
+            self._loaded_at = time.monotonic()
+            for row in CourseSearchDocument.objects.values_list('course_id', 'title', 'body', 'names'):
+                self._index(*row)
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def update(self, documents):
+        with self._lock:
+            if self._documents is None:
+                return
+            for document in documents:
+                if document.course_id in self._documents:
+                    self._unindex(document.course_id)
+                self._index(document.course_id, document.title, document.body, document.names)
+
+    def remove(self, course_ids=None):
+        if course_ids is None:
+            self.clear()
+            return
+        with self._lock:
+            if self._documents is None:
+                return
+            for course_id in course_ids:
+                if course_id in self._documents:
+                    self._unindex(course_id)
+
+    def _rank(self, query):
+        """
+        ``([(course_id, rank)], query stems)``, best matches first.
+        """
+        stems = set(tokenize(query))
+        with self._lock:
+            self._load()
+            postings = [self._postings.get(token, {}) for token in stems]
+            if not postings or not all(postings):
+                return [], stems
+            total = len(self._documents)
+            postings.sort(key=len)
+            scores = {
+                course_id: 0.0 for course_id in postings[0]
+                if all(course_id in other for other in postings[1:])
+            }
+            for documents in postings:
+                idf = math.log(1 + total / len(documents))
+                for course_id in scores:
+                    scores[course_id] += documents[course_id] * idf
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0])), stems
+
+    def filter(self, qs, query):
+        ranked, _stems = self._rank(query)
+        return order_by_ids(qs, [course_id for course_id, _rank in ranked])
+
+    def rank_similar(self, query, threshold=None):
+        """
+        ``[(course_id, similarity)]`` of courses similar to ``query`` by at least ``threshold``, best first.
+        """
+        threshold = get_trigram_threshold() if threshold is None else threshold
+        words = WORD_RE.findall(query.lower())
+        scores = defaultdict(float)
+        with self._lock:
+            self._load()
+            for query_word in words:
+                query_grams = trigrams(query_word)
+                shared = Counter(word for gram in query_grams for word in self._trigrams.get(gram, ()))
+                best = {}
+                for word, count in shared.items():
+                    similarity = count / (len(query_grams) + len(trigrams(word)) - count)
+                    for course_id in self._words[word]:
+                        best[course_id] = max(best.get(course_id, 0.0), similarity)
+                for course_id, similarity in best.items():
+                    scores[course_id] += similarity / len(words)
+        ranked = [(course_id, score) for course_id, score in scores.items() if score >= threshold]
+        return sorted(ranked, key=lambda item: (-item[1], item[0]))
+
+    def similar(self, qs, query, limit=None, threshold=None):
+        ids = [course_id for course_id, _score in self.rank_similar(query, threshold)]
+        if ids:
+            allowed = set(qs.filter(id__in=ids).values_list('id', flat=True))
+            ids = [course_id for course_id in ids if course_id in allowed]
+        return order_by_ids(qs, ids[:limit or get_trigram_limit()])
+
+    def search(self, query, qs=None, limit=None):
+        ranked, stems = self._rank(query)
+        limit = limit or get_search_limit()
+        if qs is not None and ranked:
+            allowed = set(qs.filter(id__in=[course_id for course_id, _rank in ranked]).values_list('id', flat=True))
+            ranked = [(course_id, rank) for course_id, rank in ranked if course_id in allowed]
+        hits = []
+        for course_id, rank in ranked[:limit]:
+            title, body, _names = self._documents.get(course_id, ('', '', ''))
+            hits.append(SearchHit(course_id, rank, highlight(title, stems) or highlight(body, stems)))
+        return hits
+
+
+def get_search_limit():
+    return getattr(settings, 'CNOT_SEARCH_LIMIT', 100)
+
+
+def get_trigram_limit():
+    return getattr(settings, 'CNOT_TRIGRAM_LIMIT', 50)
+
+
+def get_trigram_threshold():
+    return getattr(settings, 'CNOT_TRIGRAM_THRESHOLD', 0.3)
+
+
+def get_search_index_max_age():
+    return getattr(settings, 'CNOT_SEARCH_INDEX_MAX_AGE', 60)
+
+
+_search_backend = None
+
+
+def get_search_backend():
+    """
+    Backend configured by ``CNOT_SEARCH_BACKEND``, or one matching the database vendor.
+
+    Without PostgreSQL the in-process backend is used; set ``CNOT_SEARCH_BACKEND`` to choose it explicitly.
+    """
+    global _search_backend  # pylint: disable=global-statement
+    if _search_backend is None:
+        path = getattr(settings, 'CNOT_SEARCH_BACKEND', None)
+        if path:
+            _search_backend = import_string(path)()
+        elif connection.vendor == 'postgresql':
+            _search_backend = PostgresSearchBackend()
+        else:
+            log.warning(
+                f'Course search on {connection.vendor} uses the in-process index of every worker, '
+                f'reloaded every {get_search_index_max_age()}s; set CNOT_SEARCH_BACKEND to choose a backend'
+            )
+            _search_backend = PythonSearchBackend()
+    return _search_backend
@@ -0,0 +1,88 @@
+import logging
+
+from common.djangoapps.student.models import CourseEnrollment, EnrollStatusChange
+from common.djangoapps.student.signals import ENROLL_STATUS_CHANGE
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from xmodule.modulestore.django import SignalHandler
+
+from cnot.learners.models import LearningRequest
+from .about import invalidate_about_attributes
+from .catalog import schedule_rebuild
+from .data_api import schedule_summary_invalidation
+from .models import Author, Competence, Course, CourseStats, LikedCourse, Result
+from .search import PostgresSearchBackend
+
+log = logging.getLogger(__name__)
+
+COURSE_COUNTER_SENDERS = {
+    LikedCourse: 'likes',
+    LearningRequest: 'learning_requests',
+}
+
+
+@receiver(post_save, sender=Course)
+def rebuild_course_catalog_entry(sender, instance, **kwargs):
+    schedule_rebuild([instance.pk])
+
+
+@receiver(post_save, sender=Competence)
+@receiver(post_save, sender=Result)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Competence)
+@receiver(post_delete, sender=Result)
+@receiver(post_delete, sender=Author)
+def rebuild_related_catalog_entry(sender, instance, **kwargs):
+    schedule_rebuild([instance.course_id])
+
+
+@receiver(post_save, sender=CourseOverview)
+def rebuild_overview_catalog_entries(sender, instance, **kwargs):
+    schedule_rebuild(Course.objects.filter(course_overview=instance).values_list('id', flat=True))
+
+
+@receiver(SignalHandler.course_published)
+def invalidate_course_about_attributes(sender, course_key, **kwargs):
+    invalidate_about_attributes(course_key)
+
+
+@receiver(post_save, sender=LikedCourse)
+@receiver(post_delete, sender=LikedCourse)
+@receiver(post_save, sender=CourseEnrollment)
+def invalidate_courses_summary(sender, instance, **kwargs):
+    schedule_summary_invalidation(instance.user_id)
+
+
+@receiver(ENROLL_STATUS_CHANGE)
+def invalidate_courses_summary_on_enrollment(sender, user=None, **kwargs):
+    if user is not None:
+        schedule_summary_invalidation(user.id)
+
+
+@receiver(post_save, sender=LikedCourse)
+@receiver(post_save, sender=LearningRequest)
+def increment_course_stats(sender, instance, created=False, **kwargs):
+    if created:
+        CourseStats.increment([instance.course_id], **{COURSE_COUNTER_SENDERS[sender]: 1})
+
+
+@receiver(post_delete, sender=LikedCourse)
+@receiver(post_delete, sender=LearningRequest)
+def decrement_course_stats(sender, instance, **kwargs):
+    CourseStats.increment([instance.course_id], **{COURSE_COUNTER_SENDERS[sender]: -1})
+
+
+@receiver(ENROLL_STATUS_CHANGE)
+def update_course_enrollments_stats(sender, event=None, course_id=None, **kwargs):
+    deltas = {EnrollStatusChange.enroll: 1, EnrollStatusChange.unenroll: -1}
+    if event in deltas and course_id is not None:
+        course_ids = Course.all_objects.filter(course_overview_id=course_id).values_list('id', flat=True)
+        CourseStats.increment(course_ids, enrollments=deltas[event])
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using='default', **kwargs):
+    if sender.name == 'cnot' and connections[using].vendor == 'postgresql':
+        PostgresSearchBackend.create_index(using)
@@ -1,16 +1,25 @@
 """
 Database models for cnot.
 """
+from collections import Counter
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from model_utils.models import TimeStampedModel
 from simple_history.models import HistoricalRecords
 from user_util import user_util
 
-from ..constants import EnrollmentStatuses
+from ..constants import EnrollmentStatuses, OperationStatuses
+
+# Rows accepted by a single bulk program enrollment request
+BULK_ENROLLMENT_LIMIT = 10000
+# Users whose enrollments are retired at once
+RETIREMENT_CHUNK_SIZE = 500
 
 
 class LearningRequest(TimeStampedModel):
@@ -75,6 +84,166 @@ class ProgramEnrollment(TimeStampedModel):
         if not (self.user or self.external_user_key):
             raise ValidationError(_('One of user or external_user_key must not be null.'))
 
+    @staticmethod
+    def student_key(row):
+        """
+        Key of a bulk enrollment row in the response: its external user key, username or email.
+        """
+        return row.get('external_user_key') or row.get('username') or row.get('email')
+
+    @classmethod
+    def _resolve_users(cls, rows):
+        """
+        Ids of users of ``rows`` by username, email and external user key, read in one query,
+        and the emails of several users.
+        """
+        usernames = {row['username'] for row in rows if row.get('username')}
+        emails = {row['email'] for row in rows if row.get('email')}
+        external_keys = {row['external_user_key'] for row in rows if row.get('external_user_key')}
+        users = get_user_model().objects.filter(
+            Q(username__in=usernames) | Q(email__in=emails) | Q(cnot_programs__external_user_key__in=external_keys)
+        ).values_list('id', 'username', 'email', 'cnot_programs__external_user_key').distinct()
+
+        by_username, by_email, by_external_key = {}, {}, {}
+        shared_emails = set()
+        for user_id, username, email, external_key in users:
+            by_username[username] = user_id
+            # emails are not unique: such a row cannot be resolved to one user
+            if by_email.setdefault(email, user_id) != user_id:
+                shared_emails.add(email)
+            if external_key in external_keys:
+                by_external_key[external_key] = user_id
+        return by_username, by_email, by_external_key, shared_emails
+
+    @classmethod
+    def bulk_enroll(cls, program_uuid, project_uuid, rows, batch_size=1000):
+        """
+        Enroll the students of ``rows`` in the program and return ``{student key: status}``.
+
+        A row is a dict with ``username``, ``email`` and/or ``external_user_key`` and a ``status``.
+        An enrolled row gets its status; others get an ``OperationStatuses`` error: ``DUPLICATED``
+        for a student given more than once, ``INVALID_STATUS``, ``NOT_FOUND`` for an unknown
+        username or email and ``CONFLICT`` for an existing enrollment or an email of several users.
+
+        Users and existing enrollments are read in one query each, and new enrollments are written
+        with ``bulk_create``, so the number of queries does not depend on the number of rows.
+        """
+        results = {}
+        key_counts = Counter(cls.student_key(row) for row in rows)
+        candidates = []
+        for row in rows:
+            key = cls.student_key(row)
+            if key_counts[key] > 1:
+                results[key] = OperationStatuses.DUPLICATED
+            elif row.get('status') not in EnrollmentStatuses.__ALL__:
+                results[key] = OperationStatuses.INVALID_STATUS
+            else:
+                candidates.append(row)
+
+        by_username, by_email, by_external_key, shared_emails = cls._resolve_users(candidates)
+        resolved = []
+        for row in candidates:
+            user_id = by_username.get(row.get('username'))
+            if user_id is None and row.get('email') in shared_emails:
+                results[cls.student_key(row)] = OperationStatuses.CONFLICT
+                continue
+            user_id = user_id or by_email.get(row.get('email'))
+            if user_id is None and (row.get('username') or row.get('email')):
+                results[cls.student_key(row)] = OperationStatuses.NOT_FOUND
+                continue
+            resolved.append((row, user_id or by_external_key.get(row.get('external_user_key'))))
+
+        user_counts = Counter(user_id for _row, user_id in resolved if user_id is not None)
+        existing = cls.objects.filter(program_uuid=program_uuid, project_uuid=project_uuid).filter(
+            Q(user_id__in=set(user_counts))
+            | Q(external_user_key__in={row['external_user_key'] for row, _ in resolved if row.get('external_user_key')})
+        ).values_list('user_id', 'external_user_key')
+        existing_users, existing_keys = set(), set()
+        for user_id, external_key in existing:
+            existing_users.add(user_id)
+            existing_keys.add(external_key)
+        # pending enrollments have no user, enrollments by username no external key
+        existing_users.discard(None)
+        existing_keys.discard(None)
+
+        now = timezone.now()
+        enrollments = {}
+        for row, user_id in resolved:
+            key = cls.student_key(row)
+            if user_id is not None and user_counts[user_id] > 1:
+                results[key] = OperationStatuses.DUPLICATED
+            elif user_id in existing_users or row.get('external_user_key') in existing_keys:
+                results[key] = OperationStatuses.CONFLICT
+            else:
+                enrollments[key] = cls(
+                    user_id=user_id, external_user_key=row.get('external_user_key'), program_uuid=program_uuid,
+                    project_uuid=project_uuid, status=row['status'], created=now, modified=now,
+                )
+
+        with transaction.atomic():
+            cls.objects.bulk_create(enrollments.values(), batch_size=batch_size, ignore_conflicts=True)
+            # bulk_create sets no primary keys with ignore_conflicts: read the rows back by the
+            # submitted student keys; rows skipped as conflicts have another user, key or status
+            submitted = {
+                (enrollment.user_id, enrollment.external_user_key, enrollment.status)
+                for enrollment in enrollments.values()
+            }
+            created = [
+                enrollment
+                for enrollment in cls.objects.filter(program_uuid=program_uuid, project_uuid=project_uuid).filter(
+                    Q(user_id__in={user_id for user_id, _key, _status in submitted if user_id is not None})
+                    | Q(external_user_key__in={key for _user_id, key, _status in submitted if key is not None})
+                )
+                if (enrollment.user_id, enrollment.external_user_key, enrollment.status) in submitted
+            ]
+            cls.historical_records.bulk_history_create(created, batch_size=batch_size, default_date=now)
+
+        created_keys = {(enrollment.user_id, enrollment.external_user_key) for enrollment in created}
+        for key, enrollment in enrollments.items():
+            if (enrollment.user_id, enrollment.external_user_key) in created_keys:
+                results[key] = enrollment.status
+            else:
+                results[key] = OperationStatuses.CONFLICT
+        return results
+
+    @classmethod
+    def retire_users(cls, user_ids, chunk_size=RETIREMENT_CHUNK_SIZE):
+        """
+        Retire external user keys of the enrollments of ``user_ids``, in their history as well.
+
+        Retired keys are computed in memory; each chunk of users costs three queries: one read
+        and an ``UPDATE`` of the enrollments and of their historical records. No history rows
+        are added. Returns ids of the users who had enrollments.
+        """
+        user_ids = list(user_ids)
+        history = cls.historical_records.model
+        retired_users = set()
+        for start in range(0, len(user_ids), chunk_size):
+            enrollments = cls.objects.filter(user_id__in=user_ids[start:start + chunk_size])
+            keys = set()
+            for user_id, external_key in enrollments.values_list('user_id', 'external_user_key'):
+                retired_users.add(user_id)
+                if external_key is not None:
+                    keys.add(external_key)
+            if not keys:
+                continue
+
+            retired_keys = Case(*(
+                When(external_user_key=key, then=Value(
+                    user_util.get_retired_external_key(key, settings.RETIRED_USER_SALTS)
+                ))
+                for key in keys
+            ))
+            with transaction.atomic():
+                enrollments.filter(external_user_key__in=keys).update(
+                    external_user_key=retired_keys, modified=timezone.now(),
+                )
+                # past keys of an enrollment are replaced with its retired key
+                history.objects.filter(id__in=enrollments.exclude(external_user_key=None).values('id')).update(
+                    external_user_key=Subquery(cls.objects.filter(pk=OuterRef('id')).values('external_user_key')[:1]),
+                )
+        return retired_users
+
     @classmethod
     def retire_user(cls, user_id):
         """
@@ -82,21 +251,7 @@ class ProgramEnrollment(TimeStampedModel):
         Return True if there is data that was retired
         Return False if there is no matching data
         """
-
-        enrollments = cls.objects.filter(user=user_id)
-        if not enrollments:
-            return False
-
-        for enrollment in enrollments:
-            retired_external_key = user_util.get_retired_external_key(
-                enrollment.external_user_key,
-                settings.RETIRED_USER_SALTS,
-            )
-            enrollment.historical_records.update(external_user_key=retired_external_key)
-            enrollment.external_user_key = retired_external_key
-            enrollment.save()
-
-        return True
+        return bool(cls.retire_users([user_id]))
 
     def __str__(self):
         return f'<ProgrammEnrollment, ID: {self.id}>'
@@ -0,0 +1,18 @@
+"""
+Rebuild prebuilt course catalog entries.
+"""
+from django.core.management.base import BaseCommand
+
+from cnot.courses.catalog import CHUNK_SIZE, rebuild_catalog_entries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild CourseCatalogEntry payloads for all courses or for the given course ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int)
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        written = rebuild_catalog_entries(options['course_ids'] or None, chunk_size=options['chunk_size'])
+        self.stdout.write(f'Catalog entries rebuilt: {written}')
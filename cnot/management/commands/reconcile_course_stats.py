@@ -0,0 +1,20 @@
+"""
+Recount course popularity counters from the source tables.
+"""
+from django.core.management.base import BaseCommand
+
+from cnot.courses.models import COURSE_COUNTERS, CourseStats
+
+
+class Command(BaseCommand):
+    help = 'Recount CourseStats counters for all courses or for the given course ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int)
+        parser.add_argument('--counter', action='append', choices=COURSE_COUNTERS, dest='counters')
+
+    def handle(self, *args, **options):
+        corrected = CourseStats.reconcile(
+            options['course_ids'] or None, counters=tuple(options['counters'] or COURSE_COUNTERS),
+        )
+        self.stdout.write(f'Course stats corrected: {corrected}')
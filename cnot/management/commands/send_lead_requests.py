@@ -0,0 +1,30 @@
+"""
+Send pending CRM leads to Bitrix24.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from cnot.profiles.leads import BATCH_SIZE, CONCURRENCY, drain_lead_requests
+
+
+class Command(BaseCommand):
+    help = 'Send created and failed LeadRequest rows to Bitrix24, retrying with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new leads')
+        parser.add_argument('--interval', type=float, default=10, help='Polling interval in seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            stats = drain_lead_requests(batch_size=options['batch_size'], concurrency=options['concurrency'])
+            self.stdout.write(
+                f'Leads sent: {stats["sent"]}, errors: {stats["error"]}, failed: {stats["failed"]}; '
+                f'batches: {stats["batches"]}, fill ratio: {stats["fill_ratio"]:.2f}, '
+                f'leads/sec: {stats["leads_per_second"]:.1f}'
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
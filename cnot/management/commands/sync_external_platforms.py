@@ -0,0 +1,23 @@
+"""
+Synchronize external courses with the feeds of external platforms.
+"""
+from django.core.management.base import BaseCommand
+
+from cnot.core.models import ExternalPlatform
+from cnot.core.sync import MAX_WORKERS, sync_external_platforms
+
+
+class Command(BaseCommand):
+    help = 'Fetch external platform feeds and update changed external courses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('platform_ids', nargs='*', type=int)
+        parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+
+    def handle(self, *args, **options):
+        platforms = ExternalPlatform.objects.exclude(sources_list_url=None)
+        if options['platform_ids']:
+            platforms = platforms.filter(pk__in=options['platform_ids'])
+        results = sync_external_platforms(platforms, max_workers=options['workers'])
+        for platform in platforms:
+            self.stdout.write(f'{platform.title}: {results.get(platform.pk)}')
@@ -0,0 +1,167 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+``LimitOffsetPagination`` reads and drops every row before the requested page and counts
+the whole list on each request. ``CursorPagination`` continues right after the last row
+of the previous page instead, so any page costs as much as the first one, and it counts
+rows only when asked to (``?with_count=true``).
+
+Clients of the former ``LimitOffsetPagination`` may still send ``?offset=`` for a transition
+period: such requests are paginated by offset and always counted.
+"""
+import base64
+import binascii
+from functools import partial, wraps
+from typing import Any, List, Optional
+
+import orjson
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from ninja import Field, Schema
+from ninja.conf import settings
+from ninja.errors import HttpError
+from ninja.pagination import PaginationBase, make_response_paginated
+
+from .utils import db_sync_to_async
+
+MAX_LIMIT = 100
+
+
+def encode_cursor(data):
+    return base64.urlsafe_b64encode(orjson.dumps(data)).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering=('id',)):
+    """
+    Cursor data: ``{'after': [values of ordering]}`` or ``{'offset': n}``. Clients may craft
+    cursors, so anything else is answered with a 400.
+    """
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        data = None
+    if not isinstance(data, dict):
+        raise HttpError(400, 'Invalid cursor')
+    if 'offset' in data:
+        offset = data['offset']
+        if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+            raise HttpError(400, 'Invalid cursor')
+    if 'after' in data:
+        after = data['after']
+        if (
+            not isinstance(after, list)
+            or len(after) != len(ordering)
+            or not all(isinstance(value, (str, int, float)) for value in after)
+        ):
+            raise HttpError(400, 'Invalid cursor')
+    return data
+
+
+def keyset_filter(ordering, values):
+    """
+    Rows following ``values`` in ``ordering``: ``a > x OR (a = x AND b > y)`` for ``('a', 'b')``.
+    """
+    q = Q()
+    for i, field in enumerate(ordering):
+        equal = {name.lstrip('-'): value for name, value in zip(ordering[:i], values[:i])}
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        q |= Q(**equal, **{f'{field.lstrip("-")}__{lookup}': values[i]})
+    return q
+
+
+class CursorPagination(PaginationBase):
+    """
+    Pages ordered by ``ordering``, e.g. ``('id',)`` or ``('modified', 'pk')``; the last field must be unique.
+
+    The view may return a queryset without ordering (``ordering`` is applied) or ordered
+    by ``ordering``. Lists and querysets in any other order, e.g. by search rank, are paginated
+    by offset, which the cursor hides from clients as well.
+    """
+
+    class Input(Schema):
+        cursor: Optional[str] = None
+        limit: int = Field(settings.PAGINATION_PER_PAGE, ge=1, le=MAX_LIMIT)
+        with_count: bool = False
+        offset: Optional[int] = Field(None, ge=0, description='Deprecated, use cursor')
+
+    class Output(Schema):
+        items: List[Any]
+        next: Optional[str] = None
+        count: Optional[int] = None
+
+    def __init__(self, ordering=('id',), **kwargs):
+        self.ordering = tuple(ordering)
+        super().__init__(**kwargs)
+
+    def _is_keyset(self, queryset):
+        query = getattr(queryset, 'query', None)
+        return query is not None and tuple(query.order_by) in ((), self.ordering)
+
+    @staticmethod
+    def _value(item, name):
+        if isinstance(item, dict):
+            return item['id'] if name == 'pk' else item[name]
+        return getattr(item, name)
+
+    def paginate_queryset(self, queryset, pagination: Input, **params):
+        limit = pagination.limit
+        legacy = pagination.offset is not None and not pagination.cursor
+        if legacy:
+            cursor = {'offset': pagination.offset}
+        else:
+            cursor = decode_cursor(pagination.cursor, self.ordering) if pagination.cursor else {}
+        count = self._items_count(queryset) if pagination.with_count or legacy else None
+
+        keyset = self._is_keyset(queryset) and 'offset' not in cursor
+        if keyset:
+            page = queryset.order_by(*self.ordering)
+            if 'after' in cursor:
+                page = page.filter(keyset_filter(self.ordering, cursor['after']))
+            try:
+                items = list(page[:limit + 1])
+            except (ValidationError, TypeError, ValueError) as exc:
+                # cursor values that do not fit the ordering fields, e.g. a string for a date
+                raise HttpError(400, 'Invalid cursor') from exc
+        else:
+            offset = cursor.get('offset', 0)
+            if self._is_keyset(queryset):
+                queryset = queryset.order_by(*self.ordering)
+            items = list(queryset[offset:offset + limit + 1])
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            if keyset:
+                next_cursor = {'after': [self._value(items[-1], name.lstrip('-')) for name in self.ordering]}
+            else:
+                next_cursor = {'offset': offset + limit}
+        return {
+            'items': items,
+            'next': encode_cursor(next_cursor) if next_cursor else None,
+            'count': count,
+        }
+
+
+def apaginate(pagination_class=CursorPagination, **paginator_params):
+    """
+    ``ninja.pagination.paginate`` for async views. The view returns a lazy queryset,
+    which is read in ``db_sync_to_async``.
+    """
+    paginator = pagination_class(**paginator_params)
+
+    def wrapper(func):
+        @wraps(func)
+        async def view_with_pagination(*args, **kwargs):
+            pagination = kwargs.pop('ninja_pagination')
+            items = await func(*args, **kwargs)
+            return await db_sync_to_async(paginator.paginate_queryset)(items, pagination=pagination, **kwargs)
+
+        view_with_pagination._ninja_contribute_args = [  # pylint: disable=protected-access
+            ('ninja_pagination', paginator.Input, paginator.InputSource),
+        ]
+        view_with_pagination._ninja_contribute_to_operation = partial(  # pylint: disable=protected-access
+            make_response_paginated, paginator,
+        )
+        return view_with_pagination
+
+    return wrapper
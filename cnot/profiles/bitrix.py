@@ -0,0 +1,83 @@
+"""
+Minimal Bitrix24 REST client working through an incoming webhook.
+"""
+import logging
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+# Bitrix24 executes at most 50 commands per batch call
+BATCH_LIMIT = 50
+
+
+class BitrixError(Exception):
+    """
+    Bitrix24 rejected the call or could not be reached.
+    """
+
+
+def build_query(params, prefix=''):
+    """
+    Encode nested params the way PHP ``http_build_query`` does, as Bitrix expects in batch commands.
+    """
+    if isinstance(params, dict):
+        items = params.items()
+    elif isinstance(params, (list, tuple)):
+        items = enumerate(params)
+    else:
+        return f'{prefix}={quote("" if params is None else str(params), safe="")}'
+    return '&'.join(
+        build_query(value, f'{prefix}[{key}]' if prefix else str(key)) for key, value in items
+    )
+
+
+class BitrixClient:
+    def __init__(self, webhook, timeout=10, session=None):
+        self.webhook = webhook if webhook.endswith('/') else f'{webhook}/'
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def call(self, method, params):
+        """
+        Call a REST ``method`` and return its ``result``.
+        """
+        try:
+            response = self.session.post(f'{self.webhook}{method}.json', json=params, timeout=self.timeout)
+            data = response.json()
+        except (requests.RequestException, ValueError) as exc:
+            raise BitrixError(f'{method}: {exc}') from exc
+
+        if response.status_code >= 400 or 'error' in data:
+            raise BitrixError(f"{method}: {data.get('error')} {data.get('error_description', '')}".strip())
+        return data.get('result')
+
+    def batch(self, commands, halt=False):
+        """
+        Run up to ``BATCH_LIMIT`` calls at once.
+
+        ``commands`` maps command names to ``(method, params)``. Returns ``(results, errors)``,
+        both keyed by command name; commands without a result are reported as errors.
+        """
+        if len(commands) > BATCH_LIMIT:
+            raise ValueError(f'Bitrix24 batch accepts at most {BATCH_LIMIT} commands')
+        cmd = {name: f'{method}?{build_query(params)}' for name, (method, params) in commands.items()}
+        result = self.call('batch', {'halt': int(halt), 'cmd': cmd}) or {}
+        # PHP serializes empty maps as lists
+        results = result.get('result') or {}
+        raw_errors = result.get('result_error') or {}
+        errors = {
+            name: f"{error.get('error')} {error.get('error_description', '')}".strip()
+            for name, error in raw_errors.items()
+        }
+        for name in commands:
+            if name not in results and name not in errors:
+                errors[name] = 'No result in batch response'
+        return results, errors
+
+
+def get_client():
+    webhook = f'{settings.BITRIX_URL}rest/{settings.BITRIX_USER_ID}/{settings.BITRIX_WEBHOOK}/'
+    return BitrixClient(webhook, timeout=getattr(settings, 'BITRIX_TIMEOUT', 10))
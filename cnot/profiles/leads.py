@@ -0,0 +1,118 @@
+"""
+Delivery of ``LeadRequest`` rows (the CRM outbox) to Bitrix24.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .bitrix import BATCH_LIMIT, BitrixError, get_client
+from .models import LeadRequest
+
+log = logging.getLogger(__name__)
+
+# Leads claimed at once; they are sent in Bitrix batch calls of up to BATCH_LIMIT commands
+BATCH_SIZE = 200
+CONCURRENCY = 4
+# A claimed lead is returned to the queue if its worker did not report back in time
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff: 30 seconds after the first failure, at most 6 hours.
+    """
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 6 * 60 * 60))
+
+
+def claim_lead_requests(batch_size=BATCH_SIZE):
+    """
+    Lock a batch of due leads, mark them as ``sending`` and return them.
+
+    Rows locked by other workers are skipped, so several drainers can run at once.
+    """
+    now = timezone.now()
+    due = Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+    with transaction.atomic():
+        leads = list(
+            LeadRequest.objects.select_for_update(skip_locked=True)
+            .filter((Q(status__in=('created', 'error')) & due) | Q(status='sending', next_attempt_at__lte=now))
+            .order_by('created')[:batch_size]
+        )
+        LeadRequest.objects.filter(pk__in=[lead.pk for lead in leads]).update(
+            status='sending', next_attempt_at=now + CLAIM_TIMEOUT,
+        )
+    return leads
+
+
+def mark_sent(lead):
+    lead.status = 'sent'
+    lead.attempts += 1
+    lead.next_attempt_at = None
+    lead.last_error = ''
+    lead.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'modified'])
+
+
+def mark_error(lead, error):
+    lead.attempts += 1
+    lead.last_error = str(error)
+    if lead.attempts >= getattr(settings, 'BITRIX_LEAD_MAX_ATTEMPTS', 10):
+        lead.status = 'failed'
+        lead.next_attempt_at = None
+    else:
+        lead.status = 'error'
+        lead.next_attempt_at = timezone.now() + retry_delay(lead.attempts)
+    lead.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'modified'])
+    log.error(f'Cannot send request to Bitrix24: {lead}, attempt {lead.attempts}: {error}')
+
+
+def _send_batch(client, leads):
+    """
+    Send ``leads`` in one Bitrix batch call and return ``{lead pk: error or None}``.
+    """
+    commands = {f'lead_{lead.pk}': (lead.method, lead.params) for lead in leads}
+    try:
+        _results, errors = client.batch(commands)
+    except BitrixError as exc:
+        return {lead.pk: exc for lead in leads}
+    return {lead.pk: errors.get(f'lead_{lead.pk}') for lead in leads}
+
+
+def drain_lead_requests(client=None, batch_size=BATCH_SIZE, concurrency=CONCURRENCY):
+    """
+    Send all due leads using Bitrix batch calls, ``concurrency`` calls at a time.
+
+    Returns counters of lead statuses and throughput metrics: number of batch calls,
+    their average fill ratio and leads per second.
+    """
+    client = client or get_client()
+    stats = {'sent': 0, 'error': 0, 'failed': 0, 'batches': 0}
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            leads = claim_lead_requests(batch_size)
+            if not leads:
+                break
+            chunks = [leads[i:i + BATCH_LIMIT] for i in range(0, len(leads), BATCH_LIMIT)]
+            # Only HTTP calls run in the pool; statuses are saved from this thread
+            for chunk, errors in zip(chunks, executor.map(lambda chunk: _send_batch(client, chunk), chunks)):
+                for lead in chunk:
+                    error = errors[lead.pk]
+                    if error is None:
+                        mark_sent(lead)
+                    else:
+                        mark_error(lead, error)
+                    stats[lead.status] += 1
+            stats['batches'] += len(chunks)
+
+    elapsed = time.monotonic() - started
+    processed = stats['sent'] + stats['error'] + stats['failed']
+    stats['fill_ratio'] = processed / (stats['batches'] * BATCH_LIMIT) if stats['batches'] else 0.0
+    stats['leads_per_second'] = processed / elapsed if elapsed else 0.0
+    log.info(f'Lead requests drained: {stats}')
+    return stats
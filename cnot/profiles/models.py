@@ -1,6 +1,7 @@
 """
 Database models for cnot profiles.
 """
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
@@ -167,14 +168,21 @@ class UrFUProfile(TimeStampedModel):
 
 class LeadRequest(TimeStampedModel):
     """
-    Model for store CRM requests
+    Model for store CRM requests.
+
+    Works as an outbox: rows are created together with a profile and are sent
+    to Bitrix24 by ``cnot.profiles.leads.drain_lead_requests``.
     """
     STATUSES = (
         ('created', 'created'),
+        ('sending', 'sending'),
         ('sent', 'sent'),
-        ('error', 'error')
+        ('error', 'error'),
+        ('failed', 'failed'),
     )
     method = models.CharField(max_length=32, null=False, blank=False)
+    user = models.ForeignKey(get_user_model(), related_name='lead_requests', null=True, blank=True,
+                             on_delete=models.SET_NULL)
     title = models.CharField(max_length=32, blank=True)
     name = models.CharField(max_length=32, blank=True)
     second_name = models.CharField(max_length=32, null=True, blank=True)
@@ -183,11 +191,43 @@ class LeadRequest(TimeStampedModel):
     email = models.CharField(max_length=32, blank=True)
     phone = models.CharField(max_length=32, blank=True)
     status = models.CharField(max_length=10, choices=STATUSES, default=STATUSES[0][0])
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    last_error = models.TextField(blank=True, default='')
 
     def set_status(self, status):
         self.status = status
         self.save()
 
+    @classmethod
+    def create_for_profile(cls, profile):
+        return cls.objects.create(
+            method='crm.lead.add',
+            user=profile.user,
+            title=settings.BITRIX_LEAD_TITLE_DEFAULT,
+            name=profile.first_name,
+            second_name=profile.second_name,
+            last_name=profile.last_name,
+            status_id='NEW',
+            email=profile.user.email if profile.user else '',
+            phone=profile.phone,
+        )
+
+    @property
+    def params(self):
+        """
+        Parameters of the ``crm.lead.add`` call.
+        """
+        return {'fields': {
+            'TITLE': self.title,
+            'NAME': self.name,
+            'SECOND_NAME': self.second_name,
+            'LAST_NAME': self.last_name,
+            'STATUS_ID': self.status_id,
+            'EMAIL': [{'ID': self.user_id, 'VALUE': self.email, 'VALUE_TYPE': 'WORK'}],
+            'PHONE': [{'ID': self.user_id, 'VALUE': self.phone, 'VALUE_TYPE': 'MOBILE'}]
+        }}
+
     def __str__(self):
         """
         Get a string representation of this model instance.
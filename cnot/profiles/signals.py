@@ -1,10 +1,7 @@
-import asyncio
 import logging
 
-from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from fast_bitrix24 import Bitrix
 
 from .models import UrFUProfile, LeadRequest
 
@@ -14,38 +11,9 @@ log = logging.getLogger(__name__)
 @receiver(post_save, sender=UrFUProfile)
 def create_profile(sender, instance, created, **kwargs):
     if created:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        webhook = f'{settings.BITRIX_URL}rest/{settings.BITRIX_USER_ID}/{settings.BITRIX_WEBHOOK}/'
-        b = Bitrix(webhook)
-        method = 'crm.lead.add'
-        status_id = 'NEW',
-        params = {'fields': {
-            'TITLE': settings.BITRIX_LEAD_TITLE_DEFAULT,
-            'NAME': instance.first_name,
-            'SECOND_NAME': instance.second_name,
-            'LAST_NAME': instance.last_name,
-            'STATUS_ID': status_id,
-            'EMAIL': [{'ID': instance.user.id, 'VALUE': instance.user.email, 'VALUE_TYPE': 'WORK'}],
-            'PHONE': [{'ID': instance.user.id, 'VALUE': instance.phone, 'VALUE_TYPE': 'MOBILE'}]
-        }}
-        request = LeadRequest.objects.create(
-            method=method,
-            title=settings.BITRIX_LEAD_TITLE_DEFAULT,
-            name=instance.first_name,
-            second_name=instance.second_name,
-            last_name=instance.last_name,
-            status_id=status_id,
-            email=instance.user.email,
-            phone=instance.phone
-        )
-        try:
-            b.call(method, params)
-            request.set_status('sent')
-        except:
-            log.error(f'Cannot send request to Bitrix24: {instance.user}')
-            request.set_status("error")
-
+        # The outbox row commits or rolls back with the profile; it is claimed and sent
+        # by the send_lead_requests command once committed, see cnot.profiles.leads
+        LeadRequest.create_for_profile(instance)
         log.warning(f'User profile created: {instance.user}')
 
 # @receiver(post_save, sender=User)
@@ -1,16 +1,19 @@
 import logging
-from datetime import date
-from typing import List, Any
+from datetime import date, datetime
+from typing import Dict, List, Any, Optional, Union
+from uuid import UUID
 
 from common.djangoapps.student.models import UserProfile
 from django.contrib.auth.models import User
-from ninja import ModelSchema, Schema
+from ninja import Field, ModelSchema, Schema
 from ninja.orm import create_schema
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
-from openedx.core.djangoapps.models.course_details import CourseDetails
+from pydantic import Extra, root_validator
 
 from .core.models import Program, Project, Organization
+from .courses.about import get_about_attribute
 from .courses.models import Course, Author, Competence, Result, LikedCourse
+from .learners.models import BULK_ENROLLMENT_LIMIT
 from .profiles.models import UrFUProfile
 
 log = logging.getLogger(__name__)
@@ -91,11 +94,35 @@ class ProgramEnrollmentIn(Schema):
     project_uuid: str = None
 
 
+class BulkEnrollmentRowIn(Schema):
+    username: Optional[str] = None
+    email: Optional[str] = None
+    external_user_key: Optional[str] = None
+    status: str = "pending"
+
+    @root_validator(skip_on_failure=True)
+    def check_student_key(cls, values):  # pylint: disable=no-self-argument
+        if not (values.get("username") or values.get("email") or values.get("external_user_key")):
+            raise ValueError("One of username, email or external_user_key is required")
+        return values
+
+
+class BulkProgramEnrollmentIn(Schema):
+    program_uuid: UUID
+    project_uuid: UUID
+    enrollments: List[BulkEnrollmentRowIn] = Field(..., max_items=BULK_ENROLLMENT_LIMIT)
+
+
 class LikedCourseIn(Schema):
     username: str = None
     course_id: str = None
 
 
+class LikedCoursesIn(Schema):
+    like: List[int] = []
+    unlike: List[int] = []
+
+
 class UrFUProfileIn(Schema):
     last_name: str
     first_name: str
@@ -147,9 +174,20 @@ class ResultSchema(ModelSchema):
 
 
 class CourseOverviewProxy(CourseOverview):
+    """
+    Course overview with its ``description`` read from the about attribute cache.
+
+    Serialize a page of overviews with ``cnot.serialization.serialize_course_overviews``, which
+    loads their descriptions in one query.
+    """
+
+    class Meta:
+        app_label = "cnot"
+        proxy = True
+
     @property
     def description(self):
-        return CourseDetails.fetch_about_attribute(self.id, "description")
+        return get_about_attribute(self, "description")
 
 
 BaseCourseOverviewSchema = create_schema(
@@ -240,11 +278,61 @@ CourseSchema = create_schema(
         ("results", List[str], []),
         ("course_program_html", str, None),
         ("catalog_visibility", str, None),
+        ("likes", int, 0),
+        ("learning_requests", int, 0),
+        ("enrollments", int, 0),
         # ('course_overview', CourseOverviewSchema, None),
     ],
 )
 
 
+class CourseBriefSchema(Schema):
+    """
+    Course nested in program lists: enough to render a course card.
+    """
+    id: int
+    slug: str
+    display_name: Optional[str] = None
+    course_image_url: Optional[str] = None
+
+    class Config(Schema.Config):
+        # full catalog payloads must not validate as brief courses
+        extra = Extra.forbid
+
+
+class CourseFacetsSchema(Schema):
+    total: int
+    language: Dict[str, int] = {}
+    organization: Dict[str, int] = {}
+    duration: Dict[str, int] = {}
+    labor: Dict[str, int] = {}
+    external: Dict[str, int] = {}
+    enrollment_allowed: Dict[str, int] = {}
+    program: Dict[str, int] = {}
+    start_month: Dict[str, int] = {}
+
+
+class CourseSearchHitSchema(Schema):
+    id: int
+    rank: float
+    highlight: str = ""
+
+
+class CourseEnrollmentSchema(Schema):
+    id: Optional[int] = None
+    course_id: str
+    display_name: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    mode: Optional[str] = None
+    is_active: bool = True
+
+
+class UserCoursesSummarySchema(Schema):
+    enrollments: List[CourseEnrollmentSchema] = []
+    liked_course_ids: List[int] = []
+
+
 class OrganizationSchema(ModelSchema):
     class Config:
         model = Organization
@@ -261,11 +349,22 @@ class OrganizationSchema(ModelSchema):
 
 
 class ProgramSchema(ModelSchema):
+    """
+    Program with courses serialized by ``cnot.serialization.attach_courses``,
+    or with brief courses if they were not attached.
+    """
     owner: OrganizationSchema = None
-    courses: List[CourseSchema] = []
+    courses: List[Union[CourseBriefSchema, CourseSchema]] = []
+
+    @staticmethod
+    def resolve_courses(obj):
+        serialized = getattr(obj, "serialized_courses", None)
+        return obj.courses.all() if serialized is None else serialized
 
     class Config:
         model = Program
+        # serialized courses are taken as they are instead of being validated again
+        smart_union = True
         model_fields = [
             "uuid",
             "title",
@@ -280,14 +379,20 @@ class ProgramSchema(ModelSchema):
             "issued_document_name",
             "enrollment_allowed",
             "owner",
-            "courses",
         ]
 
 
 class ProjectSchema(ModelSchema):
+    """
+    Project; its programs are listed only if prefetched into ``expanded_programs`` (``?expand=programs``).
+    """
     programs: List[ProgramSchema] = []
     owner: OrganizationSchema = None
 
+    @staticmethod
+    def resolve_programs(obj):
+        return getattr(obj, "expanded_programs", [])
+
     class Config:
         model = Project
         model_fields = [
@@ -0,0 +1,148 @@
+"""
+Serialization of courses shared by many programs.
+
+Programs of a page often list the same courses. ``attach_courses`` loads every course of
+the page once and serializes it once, and each program refers to the same serialized
+course, so the cost of a page follows the number of unique courses rather than the number
+of program-course links.
+"""
+from collections import defaultdict
+
+from pydantic import PrivateAttr
+
+from .core.models import Program
+from .courses.about import load_about_attributes
+from .courses.catalog import build_payloads
+from .courses.models import Course
+from .schema import CourseBriefSchema, CourseOverviewProxy, CourseOverviewSchema, CourseSchema
+
+
+class SharedSchemaMixin:
+    """
+    Schema instance rendered once per set of ``dict()`` options however many times it is nested in a response.
+    """
+
+    def dict(self, **kwargs):
+        key = repr(sorted(kwargs.items()))
+        if key not in self._rendered:
+            self._rendered[key] = super().dict(**kwargs)
+        return self._rendered[key]
+
+
+class SharedCourseBriefSchema(SharedSchemaMixin, CourseBriefSchema):
+    _rendered = PrivateAttr(default_factory=dict)
+
+
+class SharedCourseSchema(SharedSchemaMixin, CourseSchema):
+    _rendered = PrivateAttr(default_factory=dict)
+
+
+def serialize_course(course, expanded, built_payloads=None):
+    """
+    Brief schema of ``course``, or its full catalog payload if ``expanded``.
+
+    A course without a catalog entry gets its payload from ``built_payloads`` (see
+    ``cnot.courses.catalog.build_payloads``), or the brief schema if it could not be built.
+    """
+    payload = course.catalog_payload if expanded else None
+    if payload is None and expanded and built_payloads and course.id in built_payloads:
+        payload = course.with_counters(built_payloads[course.id])
+    if payload is None:
+        return SharedCourseBriefSchema.from_orm(course)
+    return SharedCourseSchema.parse_obj(payload)
+
+
+def serialize_course_overviews(overviews):
+    """
+    ``CourseOverviewSchema`` of each of ``overviews``.
+
+    Descriptions of all the overviews are loaded with one query of the about attribute cache
+    rather than one query (or modulestore read) per overview.
+    """
+    overviews = list(overviews)
+    # plain CourseOverview instances have no description, read them as proxies in one query
+    plain = [overview.pk for overview in overviews if not isinstance(overview, CourseOverviewProxy)]
+    proxies = CourseOverviewProxy.objects.in_bulk(plain) if plain else {}
+    overviews = [proxies.get(overview.pk, overview) for overview in overviews]
+    load_about_attributes(overviews, 'description')
+    return [CourseOverviewSchema.from_orm(overview) for overview in overviews]
+
+
+def attach_courses(programs, expand=()):
+    """
+    Set ``serialized_courses`` of ``programs``, read by ``ProgramSchema``. Returns the programs.
+
+    Courses are brief unless ``expand`` contains ``'courses'``. Program-course links and
+    the unique courses are read in two queries for any number of programs; payloads of
+    courses without a catalog entry are built with a few more.
+    """
+    programs = list(programs)
+    if not programs:
+        return programs
+
+    links = defaultdict(list)
+    through = Program.courses.through.objects.filter(program__in=programs).order_by('id')
+    for program_id, course_id in through.values_list('program_id', 'course_id'):
+        links[program_id].append(course_id)
+
+    expanded = 'courses' in expand
+    courses = Course.objects.with_catalog_payloads() if expanded else Course.objects.select_related('course_overview')
+    courses = list(courses.filter(id__in={course_id for ids in links.values() for course_id in ids}))
+    built_payloads = None
+    if expanded:
+        # courses not rebuilt into the catalog yet, e.g. right after deploy
+        missing = [course.id for course in courses if course.catalog_payload is None]
+        built_payloads = build_payloads(missing) if missing else None
+
+    # the per-response memo: one serialized course for all of its programs
+    memo = {course.id: serialize_course(course, expanded, built_payloads) for course in courses}
+    for program in programs:
+        program.serialized_courses = [memo[course_id] for course_id in links[program.pk] if course_id in memo]
+    return programs
+
+
+class ProgramsWithCourses:
+    """
+    Lazy sequence of programs with their courses attached by ``attach_courses``.
+
+    With ``programs_attr`` the items are projects and courses are attached to the programs
+    prefetched into that attribute, sharing one memo per page. ``filter``/``order_by`` are
+    passed to the queryset, so the sequence is paginated by the database like a queryset.
+    """
+
+    def __init__(self, qs, expand=(), programs_attr=None):
+        self.qs = qs
+        self.expand = expand
+        self.programs_attr = programs_attr
+
+    def _clone(self, qs):
+        return type(self)(qs, self.expand, self.programs_attr)
+
+    @property
+    def query(self):
+        return self.qs.query
+
+    def filter(self, *args, **kwargs):
+        return self._clone(self.qs.filter(*args, **kwargs))
+
+    def order_by(self, *fields):
+        return self._clone(self.qs.order_by(*fields))
+
+    def _attach(self, items):
+        if self.programs_attr is None:
+            programs = items
+        else:
+            programs = [program for item in items for program in getattr(item, self.programs_attr)]
+        attach_courses(programs, self.expand)
+        return items
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._attach(list(self.qs[key]))
+        return self._attach([self.qs[key]])[0]
+
+    def __iter__(self):
+        return iter(self._attach(list(self.qs)))
+
+    def __len__(self):
+        return self.qs.count()
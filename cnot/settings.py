@@ -145,5 +145,29 @@ BITRIX_URL = 'https://fgaouvo.bitrix24.ru/'
 BITRIX_USER_ID = '1'
 BITRIX_WEBHOOK = 'zg1n9k7pmo0m7lwc'
 BITRIX_LEAD_TITLE_DEFAULT = 'УМНОЦ лид'
-
-NINJA_PAGINATION_PER_PAGE = 9
\ No newline at end of file
+BITRIX_TIMEOUT = 10
+BITRIX_LEAD_MAX_ATTEMPTS = 10
+
+NINJA_PAGINATION_PER_PAGE = 9
+
+# Django cache alias for rendered responses of public API endpoints, shared by all workers;
+# None keeps them in process memory, where invalidation reaches the current worker only
+CNOT_RESPONSE_CACHE_ALIAS = 'default'
+# Seconds a cached response is served for at most, also the most popularity counters in it lag behind
+CNOT_RESPONSE_CACHE_TIMEOUT = 300
+
+# Django cache alias holding the version of the per-process lookup cache of published programs,
+# projects and organizations; invalidation in one worker reaches all workers sharing it
+CNOT_LOOKUP_CACHE_ALIAS = 'default'
+# Seconds a looked up object is used at most, e.g. after queryset updates that send no signals
+CNOT_LOOKUP_CACHE_TIMEOUT = 60
+
+# Course search backend: a dotted path to a cnot.courses.search backend class, None picks one by database vendor
+CNOT_SEARCH_BACKEND = None
+# Seconds an in-process search index (PythonSearchBackend) is used before it is reloaded from the database
+CNOT_SEARCH_INDEX_MAX_AGE = 60
+CNOT_SEARCH_CONFIG = 'russian'
+CNOT_SEARCH_LIMIT = 100
+# Typo-tolerant search: most similar courses returned and the least similarity of a match
+CNOT_TRIGRAM_LIMIT = 50
+CNOT_TRIGRAM_THRESHOLD = 0.3
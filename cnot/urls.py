@@ -5,10 +5,12 @@ from django.conf.urls import url, include
 
 from .admin import cnot_admin_site
 from .api import api
+from .async_api import async_api
 from .core.views import GetExternalCourses
 
 urlpatterns = [
     url('^admin/', cnot_admin_site.urls),
+    url('^api/async/', async_api.urls),
     url('^api/', api.urls),
     url('^summernote/', include('django_summernote.urls')),
     url('^ext/', GetExternalCourses.as_view())
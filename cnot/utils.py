@@ -1,8 +1,13 @@
+import hashlib
 import logging
 import os
 import time
 import uuid
+from functools import lru_cache
 
+import orjson
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
 from Levenshtein import distance
 
 log = logging.getLogger(__name__)
@@ -18,10 +23,66 @@ def generate_new_filename(instance, filename):
     return fullpath
 
 
-def rough_search(dct, key):
-    res = [None, 9999]
-    for k in dct.keys():
-        l_dis = distance(str(key), str(k))
-        if l_dis < res[1]:
-            res = [k, l_dis]
-    return dct.get(res[0])
+@lru_cache(maxsize=256)
+def resolve_keys(keys, targets, max_distance=None):
+    """
+    Map every target name to the closest of ``keys`` by Levenshtein distance.
+
+    ``keys`` is a frozenset, so the mapping is computed once per dict schema and then
+    served from the cache. Targets with no key within ``max_distance`` map to None;
+    ties are broken by key order to keep the result stable.
+    """
+    ordered = sorted(keys, key=str)
+    mapping = {}
+    for target in targets:
+        best, best_distance = None, None
+        for k in ordered:
+            l_dis = distance(str(target), str(k))
+            if best_distance is None or l_dis < best_distance:
+                best, best_distance = k, l_dis
+        if best_distance is None or (max_distance is not None and best_distance > max_distance):
+            best = None
+        mapping[target] = best
+    return mapping
+
+
+def rough_get(dct, targets, max_distance=None):
+    """
+    Values of ``dct`` for several fuzzily matched keys at once, as a ``{target: value}`` dict.
+    """
+    mapping = resolve_keys(frozenset(dct), tuple(targets), max_distance)
+    return {target: dct.get(k) if k is not None else None for target, k in mapping.items()}
+
+
+def rough_search(dct, key, max_distance=None):
+    return rough_get(dct, (key,), max_distance)[key]
+
+
+def json_hash(obj):
+    """
+    Stable SHA-256 hex digest of a JSON-serializable object.
+    """
+    return hashlib.sha256(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def db_sync_to_async(func):
+    """
+    ``sync_to_async`` for read-only database work of async views.
+
+    With the default ``thread_sensitive=True`` every call of the process runs in one shared
+    thread, so the queries of concurrent requests would wait for each other. Here calls run
+    in the executor's threads, each on the connection of its thread. As at the start and end
+    of a sync request, connections older than ``CONN_MAX_AGE`` or unusable are closed around
+    each call, so idle executor threads do not keep stale connections.
+
+    The calls do not share a transaction with the caller: use it for reads only.
+    """
+
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
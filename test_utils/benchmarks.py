@@ -0,0 +1,34 @@
+"""
+Benchmarks of the test suite.
+
+They are skipped unless ``CNOT_LOAD_TEST`` is set (see ``make load_test``) and report their
+timings to the ``cnot.benchmarks`` logger, so the default run checks query counts only.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import pytest
+
+log = logging.getLogger('cnot.benchmarks')
+
+benchmark = pytest.mark.skipif(
+    not os.environ.get('CNOT_LOAD_TEST'), reason='benchmark, run with CNOT_LOAD_TEST=1 (make load_test)',
+)
+
+
+class Timer:
+    elapsed = None
+
+
+@contextmanager
+def timed(label):
+    """
+    Log the wall time of the block as ``label``; ``elapsed`` seconds are kept on the yielded timer.
+    """
+    timer = Timer()
+    started = time.perf_counter()
+    yield timer
+    timer.elapsed = time.perf_counter() - started
+    log.info('%s: %.1fms', label, timer.elapsed * 1000)
@@ -0,0 +1,104 @@
+"""
+Local fake of the Bitrix24 REST webhook for offline tests.
+"""
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+def parse_query(query):
+    """
+    Decode a PHP-style query string (``fields[EMAIL][0][VALUE]=...``) into nested dicts.
+    """
+    params = {}
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        path = re.findall(r'[^\[\]]+', key)
+        node = params
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = value
+    for field in ('EMAIL', 'PHONE'):
+        items = params.get('fields', {}).get(field)
+        if isinstance(items, dict):
+            params['fields'][field] = [items[k] for k in sorted(items, key=int)]
+    return params
+
+
+class FakeBitrix:
+    """
+    Serves ``crm.lead.add`` and ``batch`` on a local port and records every call.
+
+    Leads whose e-mail is in ``failing_emails`` are rejected.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.batches = []
+        self.failing_emails = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def webhook(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}/rest/1/secret/'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_lead(self, params):
+        emails = [item['VALUE'] for item in params['fields'].get('EMAIL', [])]
+        if self.failing_emails.intersection(emails):
+            return 400, {'error': 'ERROR_CORE', 'error_description': 'Lead rejected'}
+        with self._lock:
+            self.calls.append(('crm.lead.add', params))
+            return 200, {'result': next(self._ids)}
+
+    def batch(self, params):
+        self.batches.append(params['cmd'])
+        results, errors = {}, {}
+        for name, command in params['cmd'].items():
+            method, _, query = command.partition('?')
+            status, data = self.dispatch(method, parse_query(query))
+            if status == 200:
+                results[name] = data['result']
+            else:
+                errors[name] = data
+        return 200, {'result': {'result': results or [], 'result_error': errors or []}}
+
+    def dispatch(self, method, params):
+        if method == 'crm.lead.add':
+            return self.add_lead(params)
+        if method == 'batch':
+            return self.batch(params)
+        return 404, {'error': 'ERROR_METHOD_NOT_FOUND', 'error_description': method}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # pylint: disable=invalid-name
+                method = self.path.rstrip('/').rsplit('/', 1)[-1][:-len('.json')]
+                params = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                status, data = fake.dispatch(method, params)
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
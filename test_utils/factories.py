@@ -0,0 +1,44 @@
+"""
+Helpers for creating model instances in tests.
+"""
+import itertools
+
+from openedx.core.djangoapps.content.course_overviews.tests.factories import CourseOverviewFactory
+
+from cnot.courses.models import Author, Competence, Course, Result
+
+_sequence = itertools.count()
+
+
+def create_course(external=False, catalog_visibility='both', display_name=None, **kwargs):
+    """
+    Create a published ``Course``. Internal courses get their own ``CourseOverview``.
+    """
+    n = next(_sequence)
+    kwargs.setdefault('slug', f'course-{n}')
+    kwargs.setdefault('status', 'published')
+    if external:
+        kwargs.setdefault('display_name_f', display_name or f'External course {n}')
+        return Course.objects.create(external=True, **kwargs)
+    overview = CourseOverviewFactory.create(
+        catalog_visibility=catalog_visibility, display_name=display_name or f'Course {n}',
+    )
+    return Course.objects.create(course_overview=overview, **kwargs)
+
+
+def create_catalog(size, **kwargs):
+    """
+    Create ``size`` published courses.
+    """
+    return [create_course(**kwargs) for _ in range(size)]
+
+
+def fill_course(course, items=3):
+    """
+    Add competences, results and authors to ``course``.
+    """
+    for i in range(items):
+        Competence.objects.create(course=course, title=f'Competence {i}', order=i)
+        Result.objects.create(course=course, title=f'Result {i}', order=i)
+        Author.objects.create(course=course, name=f'Author {i}', description='', photo='author.png', order=i)
+    return course
@@ -0,0 +1,107 @@
+"""
+Local HTTP server publishing external platform feeds for offline tests.
+"""
+import hashlib
+import json
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+def make_feed(size, prefix='Course'):
+    """
+    Feed payload in the format of partner platforms.
+    """
+    return [
+        {
+            'id': n,
+            'display_name': f'{prefix} {n}',
+            'description': f'Description of {prefix.lower()} {n}',
+            'lang': 'ru',
+            'min_duration': 4,
+            'labor': 3,
+            'course_image_url': f'https://example.com/{n}.png',
+            'startdate': '2030-09-01',
+            'enddate': '2030-12-31',
+        }
+        for n in range(size)
+    ]
+
+
+def write_feed(path, size):
+    """
+    Write a feed of ``size`` courses to ``path`` without building it in memory.
+    """
+    with open(path, 'w') as f:
+        f.write('[')
+        for n in range(size):
+            if n:
+                f.write(',')
+            json.dump({**make_feed(1, prefix=f'Large {n}')[0], 'id': n}, f)
+        f.write(']')
+    return Path(path)
+
+
+class FeedServer:
+    """
+    Serves ``feeds[path]`` as JSON with an ETag and answers 304 to a matching ``If-None-Match``.
+
+    A feed is a JSON-serializable object, bytes, or a ``Path`` of a file streamed from disk.
+    """
+
+    def __init__(self):
+        self.feeds = {}
+        self.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}/{path}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                path = self.path.lstrip('/')
+                server.requests.append(path)
+                body = server.feeds[path]
+                if isinstance(body, Path):
+                    stat = body.stat()
+                    etag = f'"{stat.st_size}-{stat.st_mtime_ns}"'
+                    length = stat.st_size
+                else:
+                    if not isinstance(body, bytes):
+                        body = json.dumps(body).encode()
+                    etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+                    length = len(body)
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(length))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                if isinstance(body, Path):
+                    with body.open('rb') as f:
+                        shutil.copyfileobj(f, self.wfile)
+                else:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
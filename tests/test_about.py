@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` cache of course "about" attributes.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from openedx.core.djangoapps.content.course_overviews.tests.factories import CourseOverviewFactory
+from xmodule.modulestore.django import SignalHandler
+
+from cnot.courses import about
+from cnot.courses.models import CourseAboutAttribute
+from cnot.schema import CourseOverviewProxy
+from cnot.serialization import serialize_course_overviews
+
+
+@pytest.fixture
+def modulestore_reads(monkeypatch):
+    reads = []
+
+    def fetch_about_attribute(course_key, name):
+        reads.append(course_key)
+        return f'{name} of {course_key}'
+
+    monkeypatch.setattr(about.CourseDetails, 'fetch_about_attribute', fetch_about_attribute)
+    return reads
+
+
+@pytest.mark.django_db
+class TestAboutAttributes:
+    """
+    Tests of cnot.courses.about.
+    """
+
+    def test_page_is_loaded_in_one_query_once_cached(self, modulestore_reads, django_assert_num_queries):
+        keys = [CourseOverviewFactory.create().id for _ in range(5)]
+        about.load_about_attributes(CourseOverviewProxy.objects.filter(id__in=keys))
+        assert len(modulestore_reads) == 5
+
+        overviews = list(CourseOverviewProxy.objects.filter(id__in=keys))
+        with django_assert_num_queries(1):
+            about.load_about_attributes(overviews)
+            descriptions = [overview.description for overview in overviews]
+
+        assert len(modulestore_reads) == 5
+        assert descriptions == [f'description of {key}' for key in keys]
+
+    def test_new_course_version_is_fetched_again(self, modulestore_reads):
+        overview = CourseOverviewFactory.create()
+        about.load_about_attributes([overview])
+        overview.save()
+
+        about.load_about_attributes([overview])
+
+        assert modulestore_reads == [overview.id, overview.id]
+        assert CourseAboutAttribute.objects.get().version == about.course_version(overview)
+
+    def test_course_published_invalidates_cache(self, modulestore_reads):
+        overview = CourseOverviewFactory.create()
+        about.load_about_attributes([overview])
+
+        SignalHandler.course_published.send(sender=None, course_key=overview.id)
+
+        assert not CourseAboutAttribute.objects.exists()
+        assert about.get_about_attribute(CourseOverviewProxy.objects.get(id=overview.id)) == f'description of {overview.id}'
+        assert len(modulestore_reads) == 2
+
+    def test_serialized_overviews_read_attributes_once(self, modulestore_reads):
+        overviews = [CourseOverviewFactory.create() for _ in range(5)]
+        about.load_about_attributes(overviews)
+
+        with CaptureQueriesContext(connection) as captured:
+            schemas = serialize_course_overviews(overviews)
+
+        table = CourseAboutAttribute._meta.db_table
+        assert len([query for query in captured.captured_queries if table in query['sql']]) == 1
+        assert [schema.description for schema in schemas] == [f'description of {o.id}' for o in overviews]
+        assert len(modulestore_reads) == 5
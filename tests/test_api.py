@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` public API.
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import pytest
+from common.djangoapps.student.tests.factories import UserFactory
+from django.db import connection
+
+from cnot.cache import get_response_cache
+from cnot.core.models import Program, Project
+from cnot.courses.catalog import rebuild_catalog_entries
+from cnot.courses.models import Course, LikedCourse
+from cnot.schema import CourseSchema
+from test_utils.benchmarks import benchmark, timed
+from test_utils.factories import create_catalog, create_course, fill_course
+
+
+@pytest.mark.django_db
+class TestCatalogVisibility:
+    """
+    Tests of the catalog visibility filter used by GET /courses.
+    """
+
+    def test_hidden_and_external_courses_are_excluded(self):
+        visible = create_course()
+        create_course(catalog_visibility='about')
+        create_course(catalog_visibility='none')
+        create_course(external=True)
+        create_course(status='draft')
+
+        assert list(Course.objects.catalog_visible()) == [visible]
+
+    @pytest.mark.parametrize('catalog_size', [10, 100])
+    def test_page_cost_does_not_grow_with_catalog(self, catalog_size, django_assert_num_queries):
+        create_catalog(catalog_size)
+        create_catalog(catalog_size // 10, catalog_visibility='none')
+        qs = Course.objects.catalog_visible().order_by('id')
+
+        with django_assert_num_queries(2):
+            page = list(qs[catalog_size // 2:catalog_size // 2 + 9])
+            count = qs.count()
+
+        assert len(page) == 9
+        assert count == catalog_size
+
+
+@pytest.mark.django_db
+class TestCourseCatalogData:
+    """
+    Tests of Course.objects.with_catalog_data().
+    """
+
+    @pytest.mark.parametrize('page_size', [1, 9, 30])
+    def test_page_serialization_query_count_is_constant(self, page_size, django_assert_num_queries):
+        for course in create_catalog(page_size):
+            fill_course(course)
+
+        # Courses with overviews, results, competences and authors.
+        with django_assert_num_queries(4):
+            page = [
+                CourseSchema.from_orm(course).dict()
+                for course in Course.objects.catalog_visible().with_catalog_data().order_by('id')[:page_size]
+            ]
+
+        assert len(page) == page_size
+        assert page[0]['results'] == ['Result 0', 'Result 1', 'Result 2']
+        assert len(page[0]['authors']) == 3
+
+
+@pytest.mark.django_db
+class TestLikedCourses:
+    """
+    Tests of the batch like/unlike endpoint POST /courses/likes.
+    """
+
+    def post(self, client, **payload):
+        return client.post('/api/courses/likes', json.dumps(payload), content_type='application/json')
+
+    def test_like_and_unlike_are_idempotent(self, client, django_assert_max_num_queries):
+        user = UserFactory()
+        client.force_login(user)
+        courses = create_catalog(3)
+        ids = [course.id for course in courses]
+
+        with django_assert_max_num_queries(6):
+            response = self.post(client, like=ids + [ids[0], 0])
+        assert response.status_code == 200
+        assert sorted(response.json()['liked']) == ids
+
+        self.post(client, like=ids)
+        response = self.post(client, unlike=ids[1:])
+        assert response.json()['unliked'] == 2
+        assert self.post(client, unlike=ids[1:]).json()['unliked'] == 0
+
+        assert list(LikedCourse.objects.filter(user=user).values_list('course_id', flat=True)) == ids[:1]
+        assert client.get('/api/courses/likes').json() == ids[:1]
+
+    def test_like_course_by_username(self, client):
+        user = UserFactory()
+        course = create_course()
+
+        for _ in range(3):
+            response = client.post(
+                '/api/courses/like', json.dumps({'username': user.username, 'course_id': str(course.id)}),
+                content_type='application/json',
+            )
+            assert response.json() == {'success': True}
+        assert LikedCourse.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.django_db
+class TestProgramLists:
+    """
+    Tests of nested courses and programs in GET /programs and GET /projects.
+    """
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        get_response_cache().clear()
+
+    def create_programs(self, count, courses_per_program, project=None):
+        courses = create_catalog(courses_per_program)
+        rebuild_catalog_entries([course.id for course in courses])
+        for n in range(count):
+            program = Program.objects.create(
+                title=f'Program {n}', short_name=f'p{n}', slug=f'program-{n}', status='published', project=project,
+            )
+            program.courses.set(courses)
+        return courses
+
+    @pytest.mark.parametrize('courses_per_program', [1, 10])
+    @pytest.mark.parametrize('expand', ['', 'courses'])
+    def test_page_query_count_is_constant(self, client, courses_per_program, expand, django_assert_num_queries):
+        self.create_programs(5, courses_per_program)
+
+        # programs with owners, program-course links, courses
+        with django_assert_num_queries(3):
+            response = client.get('/api/programs', {'expand': expand})
+
+        items = response.json()['items']
+        assert len(items) == 5
+        assert all(len(item['courses']) == courses_per_program for item in items)
+
+    def test_brief_and_expanded_courses(self, client):
+        course = self.create_programs(1, 1)[0]
+
+        brief = client.get('/api/programs').json()['items'][0]['courses'][0]
+        assert set(brief) == {'id', 'slug', 'display_name', 'course_image_url'}
+        assert brief['id'] == course.id
+
+        expanded = client.get('/api/programs', {'expand': 'courses'}).json()['items'][0]['courses'][0]
+        assert expanded['id'] == course.id
+        assert expanded['likes'] == 0
+        assert 'description' in expanded
+
+    def test_project_programs_are_expanded_on_request(self, client, django_assert_num_queries):
+        project = Project.objects.create(title='Project', short_name='project', slug='project', status='published')
+        self.create_programs(3, 4, project=project)
+
+        assert client.get('/api/projects').json()['items'][0]['programs'] == []
+
+        # projects with owners, programs with owners, program-course links, courses
+        with django_assert_num_queries(4):
+            response = client.get('/api/projects', {'expand': 'programs,courses'})
+        programs = response.json()['items'][0]['programs']
+        assert len(programs) == 3
+        assert all(len(program['courses']) == 4 and 'description' in program['courses'][0] for program in programs)
+
+
+@benchmark
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_likes_throughput():
+    users = [UserFactory() for _ in range(4)]
+    ids = [course.id for course in create_catalog(20)]
+    clicks = 50
+    # the SQLite test database takes one writer at a time
+    lock = threading.Lock() if connection.vendor == 'sqlite' else nullcontext()
+
+    def click(user):
+        try:
+            for i in range(clicks):
+                with lock:
+                    LikedCourse.like(user, ids[i % 5:i % 5 + 10])
+        finally:
+            connection.close()
+
+    with timed(f'{len(users) * clicks} concurrent likes'):
+        with ThreadPoolExecutor(max_workers=len(users)) as executor:
+            list(executor.map(click, users))
+
+    assert LikedCourse.objects.count() == len(users) * 14
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` async variants of the read-only API.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from common.djangoapps.student.tests.factories import UserFactory
+from django.test import AsyncClient, Client
+
+from cnot.cache import get_response_cache
+from cnot.core.lookup import get_lookup_cache
+from cnot.core.models import Organization, Program
+from cnot.courses.catalog import rebuild_catalog_entries
+from test_utils.benchmarks import benchmark, log
+from test_utils.factories import create_catalog
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    get_lookup_cache().clear()
+    get_response_cache().clear()
+
+
+def create_data(courses_count=5):
+    courses = create_catalog(courses_count)
+    rebuild_catalog_entries([course.id for course in courses])
+    Organization.objects.create(title='UrFU', short_name='urfu', slug='urfu', status='published')
+    program = Program.objects.create(title='Program', short_name='p0', slug='program-0', status='published')
+    program.courses.set(courses)
+    return courses
+
+
+# the async views read the database on connections of other threads, which see committed data only
+@pytest.mark.django_db(transaction=True)
+class TestAsyncEndpoints:
+    """
+    The async endpoints answer exactly like their sync counterparts.
+    """
+
+    @pytest.mark.parametrize('path', [
+        '/orgs',
+        '/projects',
+        '/programs',
+        '/programs?expand=courses',
+        '/programs/program-0',
+        '/courses?limit=2',
+        '/courses/likes',
+    ])
+    def test_same_responses(self, client, path):
+        create_data()
+        client.force_login(UserFactory())
+
+        response = client.get(f'/api/async{path}')
+
+        assert response.status_code == 200
+        assert response.json() == client.get(f'/api{path}').json()
+
+    @pytest.mark.parametrize('path', ['/orgs', '/programs', '/courses?limit=2', '/courses/{id}'])
+    def test_same_anonymous_responses(self, client, path):
+        path = path.format(id=create_data()[0].id)
+
+        response = client.get(f'/api/async{path}')
+
+        assert response.status_code == 200
+        assert response.json() == client.get(f'/api{path}').json()
+
+    def test_course_detail_and_missing_course(self, client):
+        course = create_data()[0]
+
+        assert client.get(f'/api/async/courses/{course.id}').json() == client.get(f'/api/courses/{course.id}').json()
+        assert client.get('/api/async/courses/missing').status_code == 404
+
+    def test_anonymous_user_is_unauthorized(self, client):
+        assert client.get('/api/async/courses/likes').status_code == 401
+
+
+def latency_stats(latencies, elapsed):
+    latencies = sorted(latencies)
+    return len(latencies) / elapsed, latencies[int(0.99 * (len(latencies) - 1))] * 1000
+
+
+@benchmark
+@pytest.mark.django_db(transaction=True)
+def test_sync_and_async_load():
+    """
+    Report throughput and p99 latency of the sync and async course lists under the same concurrency.
+    """
+    create_data(30)
+    user = UserFactory()
+    workers, requests = 8, 200
+    path = '/courses?limit=20'
+
+    def sync_request(client):
+        started = time.perf_counter()
+        assert client.get(f'/api{path}').status_code == 200
+        return time.perf_counter() - started
+
+    clients = [Client() for _ in range(workers)]
+    for client in clients:
+        client.force_login(user)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sync_latencies = list(executor.map(sync_request, [clients[i % workers] for i in range(requests)]))
+    sync_rps, sync_p99 = latency_stats(sync_latencies, time.perf_counter() - started)
+
+    async_client = AsyncClient()
+    async_client.force_login(user)
+
+    async def load():
+        # as many requests in flight as there are sync workers
+        semaphore = asyncio.Semaphore(workers)
+
+        async def async_request():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await async_client.get(f'/api/async{path}')
+                assert response.status_code == 200
+                return time.perf_counter() - started
+
+        return await asyncio.gather(*(async_request() for _ in range(requests)))
+
+    started = time.perf_counter()
+    async_latencies = asyncio.run(load())
+    async_rps, async_p99 = latency_stats(async_latencies, time.perf_counter() - started)
+
+    log.info(
+        f'workers={workers} requests={requests} sync: {sync_rps:.0f} req/s p99={sync_p99:.1f}ms; '
+        f'async: {async_rps:.0f} req/s p99={async_p99:.1f}ms'
+    )
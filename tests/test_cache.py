@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` response cache.
+"""
+import time
+
+import pytest
+
+from cnot import api
+from cnot.cache import DjangoResponseCache, LocMemResponseCache, get_response_cache
+from cnot.core.models import Organization
+
+
+class TestLocMemResponseCache:
+    """
+    Tests of the local memory backend.
+    """
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = LocMemResponseCache(max_entries=2)
+        cache.set('a', b'1', '"a"')
+        cache.set('b', b'2', '"b"')
+        cache.get('a')
+        cache.set('c', b'3', '"c"')
+
+        assert cache.get('a') == (b'1', '"a"')
+        assert cache.get('b') is None
+
+    def test_clear(self):
+        cache = LocMemResponseCache()
+        cache.set('a', b'1', '"a"')
+        cache.clear()
+
+        assert cache.get('a') is None
+
+    def test_entries_expire(self, monkeypatch):
+        cache = LocMemResponseCache(timeout=60)
+        cache.set('a', b'1', '"a"')
+
+        assert cache.get('a') == (b'1', '"a"')
+        monkeypatch.setattr(time, 'monotonic', lambda: float('inf'))
+        assert cache.get('a') is None
+
+
+@pytest.mark.django_db
+class TestCachedEndpoints:
+    """
+    Tests of ETag handling of cached public endpoints.
+    """
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        get_response_cache().clear()
+
+    def test_shared_cache_by_default(self):
+        assert isinstance(get_response_cache(), DjangoResponseCache)
+
+    def test_not_modified_without_queries(self, client, django_assert_num_queries):
+        Organization.objects.create(title='UrFU', short_name='urfu', slug='urfu', status='published')
+        response = client.get('/api/orgs')
+        etag = response['ETag']
+
+        with django_assert_num_queries(0):
+            cached = client.get('/api/orgs')
+            not_modified = client.get('/api/orgs', HTTP_IF_NONE_MATCH=etag)
+
+        assert cached.content == response.content
+        assert not_modified.status_code == 304
+        assert not_modified['ETag'] == etag
+
+    def test_response_rendered_during_invalidation_is_not_served(self, client, monkeypatch):
+        Organization.objects.create(title='UrFU', short_name='urfu', slug='urfu', status='published')
+        published_orgs = api.published_orgs
+        renders = []
+
+        def render_during_invalidation():
+            renders.append(1)
+            if len(renders) == 1:
+                # data changes and the cache is invalidated after the lookup, before the store
+                get_response_cache().clear()
+            return published_orgs()
+
+        monkeypatch.setattr(api, 'published_orgs', render_during_invalidation)
+        client.get('/api/orgs')
+        client.get('/api/orgs')
+        client.get('/api/orgs')
+
+        assert len(renders) == 2
+
+    def test_saving_organization_invalidates_cache(self, client, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            org = Organization.objects.create(title='UrFU', short_name='urfu', slug='urfu', status='published')
+        etag = client.get('/api/orgs')['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            org.title = 'Ural Federal University'
+            org.save()
+        response = client.get('/api/orgs', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert b'Ural Federal University' in response.content
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` prebuilt course catalog.
+"""
+from datetime import date, datetime, timezone
+
+import pytest
+
+from cnot.api import CourseFilterSchema
+from cnot.cache import get_response_cache
+from cnot.core.models import Program
+from cnot.courses.catalog import catalog_facets, rebuild_catalog_entries
+from cnot.courses.models import Competence, Course, CourseCatalogEntry
+from test_utils.factories import create_catalog, create_course, fill_course
+
+
+@pytest.mark.django_db
+class TestCourseCatalogEntry:
+    """
+    Tests of CourseCatalogEntry maintenance and reads.
+    """
+
+    def test_entries_follow_course_changes(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            course = fill_course(create_course(description='Old'))
+        assert CourseCatalogEntry.objects.get(course=course).payload['competences'][0] == 'Competence 0'
+
+        with django_capture_on_commit_callbacks(execute=True):
+            course.description = 'New'
+            course.save()
+            Competence.objects.filter(course=course).first().delete()
+
+        payload = CourseCatalogEntry.objects.get(course=course).payload
+        assert payload['description'] == 'New'
+        assert len(payload['competences']) == 2
+
+    def test_removed_course_entry_is_deleted(self):
+        course = create_course()
+        rebuild_catalog_entries()
+        course.delete()
+
+        rebuild_catalog_entries([course.id])
+
+        assert not CourseCatalogEntry.objects.filter(course_id=course.id).exists()
+
+    def test_page_is_one_query(self, django_assert_num_queries):
+        for course in create_catalog(20):
+            fill_course(course)
+        assert rebuild_catalog_entries() == 20
+
+        with django_assert_num_queries(1):
+            page = list(Course.objects.catalog_visible().order_by('id').catalog_payloads()[:9])
+
+        assert len(page) == 9
+        assert page[0]['results'] == ['Result 0', 'Result 1', 'Result 2']
+
+    def test_courses_without_entries_are_built(self, client):
+        course = fill_course(create_catalog(1)[0])
+        CourseCatalogEntry.objects.all().delete()
+        get_response_cache().clear()
+
+        page = list(Course.objects.catalog_visible().catalog_payloads()[:9])
+
+        assert [payload['id'] for payload in page] == [course.id]
+        assert page[0]['results'] == ['Result 0', 'Result 1', 'Result 2']
+        assert client.get(f'/api/courses/{course.id}').json()['id'] == course.id
+
+    def test_courses_that_fail_to_build_get_brief_payloads(self, monkeypatch):
+        courses = create_catalog(3)
+        rebuild_catalog_entries([courses[0].id, courses[2].id])
+        CourseCatalogEntry.objects.filter(course=courses[1]).delete()
+        monkeypatch.setattr('cnot.courses.catalog.build_payload', lambda course: 1 / 0)
+
+        page = list(Course.objects.catalog_visible().order_by('id').catalog_payloads()[:3])
+
+        assert [payload['id'] for payload in page] == [course.id for course in courses]
+        assert set(page[1]) == {'id', 'slug', 'display_name', 'course_image_url', 'likes', 'learning_requests',
+                                'enrollments'}
+
+    def test_repeated_rebuild_replaces_entries(self):
+        course = create_course()
+
+        assert rebuild_catalog_entries([course.id]) == 1
+        assert rebuild_catalog_entries([course.id]) == 1
+        assert CourseCatalogEntry.objects.filter(course=course).count() == 1
+
+
+@pytest.mark.django_db
+class TestCatalogFacets:
+    """
+    Tests of catalog filters and facet counts.
+    """
+
+    @pytest.fixture
+    def courses(self):
+        def external(**kwargs):
+            return create_course(external=True, **kwargs)
+
+        courses = [
+            external(lang='ru', organization_f='УрФУ', labor=3, min_duration=4, enrollment_allowed=True,
+                     start_date_f=datetime(2024, 9, 1, tzinfo=timezone.utc)),
+            external(lang='ru', organization_f='УрФУ', labor=6, min_duration=6, max_duration=10,
+                     start_date_f=datetime(2024, 10, 1, tzinfo=timezone.utc)),
+            external(lang='en', organization_f='ЮУрГУ', labor=3, min_duration=20),
+        ]
+        for slug in ('data', 'it'):
+            program = Program.objects.create(slug=slug, short_name=slug, status='published')
+            program.courses.add(courses[0])
+        rebuild_catalog_entries()
+        return courses
+
+    def test_facets_are_counted_by_the_database(self, courses, django_assert_num_queries):
+        # the total and one aggregate per facet
+        with django_assert_num_queries(9):
+            facets = catalog_facets(Course.objects.all())
+
+        assert facets == {
+            'total': 3,
+            'language': {'ru': 2, 'en': 1},
+            'organization': {'УрФУ': 2, 'ЮУрГУ': 1},
+            'duration': {'0-4': 1, '9-16': 1, '17+': 1},
+            'labor': {'3': 2, '6': 1},
+            'external': {'true': 3},
+            'enrollment_allowed': {'true': 1, 'false': 2},
+            'program': {'data': 1, 'it': 1},
+            'start_month': {'2024-09': 1, '2024-10': 1},
+        }
+
+    @pytest.mark.parametrize('filters, expected', [
+        ({'language': ['ru']}, [0, 1]),
+        ({'organization': ['ЮУрГУ'], 'labor': [3]}, [2]),
+        ({'duration_min': 5, 'duration_max': 10}, [1]),
+        ({'enrollment_allowed': True}, [0]),
+        ({'program': ['data', 'it']}, [0]),
+        ({'start_after': date(2024, 9, 15)}, [1]),
+        ({'start_before': date(2024, 9, 15), 'external': True}, [0]),
+    ])
+    def test_filters(self, courses, filters, expected):
+        qs = CourseFilterSchema(**filters).filter(Course.objects.order_by('id'))
+        assert list(qs) == [courses[i] for i in expected]
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` courses data API.
+"""
+import pytest
+from common.djangoapps.student.models import CourseEnrollment
+from common.djangoapps.student.tests.factories import CourseEnrollmentFactory, UserFactory
+
+from cnot.courses.data_api import get_course_enrollments, get_user_courses_summary
+from cnot.courses.models import LikedCourse
+from test_utils.factories import create_course
+
+
+@pytest.mark.django_db
+class TestGetCourseEnrollments:
+    """
+    Tests of get_course_enrollments.
+    """
+
+    @pytest.mark.parametrize('enrollments', [1, 10, 50])
+    def test_query_count_is_constant(self, enrollments, django_assert_num_queries):
+        user = UserFactory()
+        courses = [create_course() for _ in range(enrollments)]
+        for course in courses:
+            CourseEnrollmentFactory(user=user, course_id=course.course_overview.id)
+
+        with django_assert_num_queries(2):
+            result = get_course_enrollments(user.username)
+
+        assert [enrollment.id for enrollment in result] == [course.id for course in courses]
+        assert result[0].course_id == str(courses[0].course_overview.id)
+        assert result[0].display_name == courses[0].course_overview.display_name
+
+
+@pytest.mark.django_db
+class TestUserCoursesSummary:
+    """
+    Tests of the cached per-user courses summary.
+    """
+
+    def test_summary_is_cached_until_changed(self, django_assert_num_queries, django_capture_on_commit_callbacks):
+        user = UserFactory()
+        course = create_course()
+        CourseEnrollmentFactory(user=user, course_id=course.course_overview.id, mode='audit')
+        get_user_courses_summary(user)
+
+        with django_assert_num_queries(0):
+            summary = get_user_courses_summary(user)
+        assert [(e.id, e.mode) for e in summary.enrollments] == [(course.id, 'audit')]
+        assert summary.liked_course_ids == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            LikedCourse.objects.create(user=user, course=course)
+        assert get_user_courses_summary(user).liked_course_ids == [course.id]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            CourseEnrollment.unenroll(user, course.course_overview.id)
+        assert not get_user_courses_summary(user).enrollments[0].is_active
+
+    def test_summary_is_invalidated_after_commit(self, django_capture_on_commit_callbacks):
+        user = UserFactory()
+        course = create_course()
+        get_user_courses_summary(user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            LikedCourse.objects.create(user=user, course=course)
+            # until the commit the summary cached before it is still served
+            assert get_user_courses_summary(user).liked_course_ids == []
+
+        assert get_user_courses_summary(user).liked_course_ids == [course.id]
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` program enrollments.
+"""
+import json
+import uuid
+
+import pytest
+from common.djangoapps.student.tests.factories import UserFactory
+from django.contrib.auth import get_user_model
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+from user_util import user_util
+
+from cnot.constants import OperationStatuses
+from cnot.learners.models import ProgramEnrollment
+from test_utils.benchmarks import benchmark, timed
+
+PROGRAM_UUID = uuid.uuid4()
+PROJECT_UUID = uuid.uuid4()
+
+
+def bulk_enroll(rows):
+    return ProgramEnrollment.bulk_enroll(PROGRAM_UUID, PROJECT_UUID, rows)
+
+
+@pytest.mark.django_db
+class TestBulkEnroll:
+    """
+    Tests of ProgramEnrollment.bulk_enroll().
+    """
+
+    def test_statuses(self):
+        alice, bob, carol = UserFactory(), UserFactory(), UserFactory()
+        ProgramEnrollment.objects.create(user=carol, program_uuid=PROGRAM_UUID, project_uuid=PROJECT_UUID)
+
+        results = bulk_enroll([
+            {'username': alice.username, 'status': 'enrolled'},
+            {'email': bob.email, 'status': 'pending'},
+            {'username': carol.username, 'status': 'pending'},
+            {'external_user_key': 'ext-1', 'status': 'pending'},
+            {'external_user_key': 'ext-2', 'status': 'pending'},
+            {'external_user_key': 'ext-2', 'status': 'enrolled'},
+            {'external_user_key': 'ext-3', 'status': 'graduated'},
+            {'username': 'nobody', 'status': 'pending'},
+        ])
+
+        assert results == {
+            alice.username: 'enrolled',
+            bob.email: 'pending',
+            carol.username: OperationStatuses.CONFLICT,
+            'ext-1': 'pending',
+            'ext-2': OperationStatuses.DUPLICATED,
+            'ext-3': OperationStatuses.INVALID_STATUS,
+            'nobody': OperationStatuses.NOT_FOUND,
+        }
+        assert set(ProgramEnrollment.objects.values_list('user_id', 'external_user_key', 'status')) == {
+            (carol.id, None, 'pending'),
+            (alice.id, None, 'enrolled'),
+            (bob.id, None, 'pending'),
+            (None, 'ext-1', 'pending'),
+        }
+        assert ProgramEnrollment.historical_records.count() == 4
+
+    def test_same_user_by_username_and_email_is_duplicated(self):
+        user = UserFactory()
+
+        results = bulk_enroll([
+            {'username': user.username, 'status': 'pending'},
+            {'email': user.email, 'status': 'pending'},
+        ])
+
+        assert set(results.values()) == {OperationStatuses.DUPLICATED}
+        assert not ProgramEnrollment.objects.exists()
+
+    def test_external_user_key_resolves_known_user(self):
+        user = UserFactory()
+        ProgramEnrollment.objects.create(
+            user=user, external_user_key='ext-1', program_uuid=uuid.uuid4(), project_uuid=PROJECT_UUID,
+        )
+
+        assert bulk_enroll([{'external_user_key': 'ext-1', 'status': 'pending'}]) == {'ext-1': 'pending'}
+        assert ProgramEnrollment.objects.get(program_uuid=PROGRAM_UUID).user == user
+
+    def test_email_of_several_users_conflicts(self):
+        first, second = UserFactory(), UserFactory()
+        get_user_model().objects.filter(id=second.id).update(email=first.email)
+
+        results = bulk_enroll([{'email': first.email, 'status': 'pending'}])
+
+        assert results == {first.email: OperationStatuses.CONFLICT}
+        assert not ProgramEnrollment.objects.exists()
+
+    def test_only_new_rows_get_history(self, monkeypatch):
+        now = timezone.now()
+        monkeypatch.setattr('cnot.learners.models.timezone.now', lambda: now)
+        ProgramEnrollment.objects.bulk_create([
+            ProgramEnrollment(
+                external_user_key='ext-0', program_uuid=PROGRAM_UUID, project_uuid=PROJECT_UUID,
+                created=now, modified=now,
+            ),
+        ])
+
+        assert bulk_enroll([{'external_user_key': 'ext-1', 'status': 'pending'}]) == {'ext-1': 'pending'}
+        assert list(ProgramEnrollment.historical_records.values_list('external_user_key', flat=True)) == ['ext-1']
+
+    def test_repeated_request_conflicts(self, django_assert_max_num_queries):
+        rows = [{'external_user_key': f'ext-{i}', 'status': 'pending'} for i in range(50)]
+        bulk_enroll(rows)
+
+        with django_assert_max_num_queries(6):
+            results = bulk_enroll(rows)
+
+        assert set(results.values()) == {OperationStatuses.CONFLICT}
+        assert ProgramEnrollment.objects.count() == 50
+
+
+@pytest.mark.django_db
+class TestBulkEnrollEndpoint:
+    """
+    Tests of POST /enroll/bulk.
+    """
+
+    def post(self, client, payload):
+        return client.post('/api/enroll/bulk', json.dumps(payload), content_type='application/json')
+
+    def payload(self, enrollments):
+        return {'program_uuid': str(PROGRAM_UUID), 'project_uuid': str(PROJECT_UUID), 'enrollments': enrollments}
+
+    def test_superuser_only(self, client):
+        client.force_login(UserFactory())
+
+        assert self.post(client, self.payload([{'external_user_key': 'ext-1'}])).status_code == 401
+
+    def test_enroll(self, client):
+        client.force_login(UserFactory(is_superuser=True))
+
+        response = self.post(client, self.payload([{'external_user_key': 'ext-1'}, {'external_user_key': 'ext-2'}]))
+
+        assert response.status_code == 200
+        assert response.json() == {'ext-1': 'pending', 'ext-2': 'pending'}
+
+    def test_row_without_student_key_is_rejected(self, client):
+        client.force_login(UserFactory(is_superuser=True))
+
+        assert self.post(client, self.payload([{'status': 'pending'}])).status_code == 422
+
+
+@benchmark
+@pytest.mark.django_db
+def test_bulk_enroll_benchmark():
+    size = 10000
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(username=f'student-{i}', email=f'student-{i}@example.com') for i in range(size // 2)
+    )
+    rows = [{'username': user.username, 'status': 'pending'} for user in users] + [
+        {'external_user_key': f'ext-{i}', 'status': 'pending'} for i in range(size - len(users))
+    ]
+
+    with timed(f'bulk enrollment of {size} rows'):
+        results = bulk_enroll(rows)
+
+    assert set(results.values()) == {'pending'}
+    assert ProgramEnrollment.objects.count() == size
+
+
+@pytest.fixture
+def retired_user_salts(settings):
+    settings.RETIRED_USER_SALTS = ['salt-1', 'salt-2']
+    return settings.RETIRED_USER_SALTS
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('retired_user_salts')
+class TestRetireUsers:
+    """
+    Tests of ProgramEnrollment.retire_users().
+    """
+
+    def test_keys_are_retired_without_new_history(self, retired_user_salts, django_assert_num_queries):
+        user, other = UserFactory(), UserFactory()
+        enrollment = ProgramEnrollment.objects.create(
+            user=user, external_user_key='old-key', program_uuid=PROGRAM_UUID, project_uuid=PROJECT_UUID,
+        )
+        enrollment.external_user_key = 'ext-1'
+        enrollment.save()
+        ProgramEnrollment.objects.create(user=other, external_user_key='ext-2', program_uuid=PROGRAM_UUID,
+                                         project_uuid=PROJECT_UUID)
+
+        with django_assert_num_queries(3):
+            assert ProgramEnrollment.retire_users([user.id, 10 ** 6]) == {user.id}
+
+        retired_key = user_util.get_retired_external_key('ext-1', retired_user_salts)
+        enrollment.refresh_from_db()
+        assert enrollment.external_user_key == retired_key
+        assert set(enrollment.historical_records.values_list('external_user_key', flat=True)) == {retired_key}
+        assert enrollment.historical_records.count() == 2
+        assert ProgramEnrollment.objects.get(user=other).external_user_key == 'ext-2'
+
+    def test_queries_per_chunk(self, django_assert_num_queries):
+        users = [UserFactory() for _ in range(3)]
+        for n, user in enumerate(users):
+            ProgramEnrollment.objects.create(user=user, external_user_key=f'ext-{n}', program_uuid=PROGRAM_UUID,
+                                             project_uuid=PROJECT_UUID)
+
+        with django_assert_num_queries(6):
+            assert ProgramEnrollment.retire_users([user.id for user in users], chunk_size=2) == {
+                user.id for user in users
+            }
+
+    def test_retire_user(self):
+        user = UserFactory()
+        ProgramEnrollment.objects.create(user=user, external_user_key='ext-1', program_uuid=PROGRAM_UUID,
+                                         project_uuid=PROJECT_UUID)
+
+        assert ProgramEnrollment.retire_user(user.id) is True
+        assert ProgramEnrollment.retire_user(UserFactory().id) is False
+
+
+@benchmark
+@pytest.mark.django_db
+@pytest.mark.usefixtures('retired_user_salts')
+def test_retire_users_throughput():
+    size = 5000
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(username=f'student-{i}', email=f'student-{i}@example.com') for i in range(size)
+    )
+    user_ids = list(get_user_model().objects.filter(username__startswith='student-').values_list('id', flat=True))
+    bulk_enroll([{'username': user.username, 'status': 'pending'} for user in users])
+    ProgramEnrollment.objects.update(external_user_key=Concat(Value('ext-'), Cast('user_id', CharField())))
+
+    with timed(f'retirement of {size} users'):
+        retired = ProgramEnrollment.retire_users(user_ids)
+
+    assert retired == set(user_ids)
+    assert not ProgramEnrollment.objects.filter(external_user_key__startswith='ext-').exists()
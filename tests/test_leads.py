@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` CRM lead outbox.
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from cnot.profiles.bitrix import BitrixClient
+from cnot.profiles.leads import drain_lead_requests
+from cnot.profiles.models import LeadRequest, UrFUProfile
+from test_utils.bitrix import FakeBitrix
+
+
+@pytest.fixture
+def bitrix():
+    with FakeBitrix() as fake:
+        yield fake
+
+
+def create_profile(n):
+    user = get_user_model().objects.create(username=f'user{n}', email=f'user{n}@example.com')
+    return UrFUProfile.objects.create(
+        user=user, last_name='Ivanov', first_name='Ivan', phone='+70000000000', specialty='-',
+        country='RU', education_level='H', job='-', position='-', birth_date='2000-01-01',
+    )
+
+
+@pytest.mark.django_db
+class TestLeadOutbox:
+    """
+    Tests of LeadRequest creation and delivery.
+    """
+
+    def test_profile_creation_only_queues_lead(self, bitrix):
+        # written in the transaction of the profile: no on_commit callback has to run
+        create_profile(1)
+
+        lead = LeadRequest.objects.get()
+        assert lead.status == 'created'
+        assert lead.status_id == 'NEW'
+        assert not bitrix.calls
+
+    def test_lead_is_rolled_back_with_profile(self):
+        with pytest.raises(RuntimeError), transaction.atomic():
+            create_profile(1)
+            raise RuntimeError
+
+        assert not UrFUProfile.objects.exists()
+        assert not LeadRequest.objects.exists()
+
+    def test_drain_sends_all_leads(self, bitrix):
+        for n in range(10):
+            create_profile(n)
+
+        stats = drain_lead_requests(BitrixClient(bitrix.webhook), batch_size=3, concurrency=2)
+
+        assert (stats['sent'], stats['error'], stats['failed']) == (10, 0, 0)
+        assert len(bitrix.calls) == 10
+        assert set(LeadRequest.objects.values_list('status', flat=True)) == {'sent'}
+
+    def test_failed_lead_is_retried_with_backoff(self, bitrix):
+        create_profile(1)
+        bitrix.failing_emails.add('user1@example.com')
+
+        stats = drain_lead_requests(BitrixClient(bitrix.webhook))
+
+        lead = LeadRequest.objects.get()
+        assert stats['error'] == 1
+        assert lead.attempts == 1
+        assert lead.next_attempt_at > timezone.now()
+        assert 'Lead rejected' in lead.last_error
+
+        # Not due yet
+        assert drain_lead_requests(BitrixClient(bitrix.webhook))['sent'] == 0
+
+        bitrix.failing_emails.clear()
+        LeadRequest.objects.update(next_attempt_at=timezone.now())
+        assert drain_lead_requests(BitrixClient(bitrix.webhook))['sent'] == 1
+
+    def test_lead_fails_after_max_attempts(self, bitrix, settings):
+        settings.BITRIX_LEAD_MAX_ATTEMPTS = 2
+        create_profile(1)
+        bitrix.failing_emails.add('user1@example.com')
+
+        drain_lead_requests(BitrixClient(bitrix.webhook))
+        LeadRequest.objects.update(next_attempt_at=timezone.now())
+        drain_lead_requests(BitrixClient(bitrix.webhook))
+
+        assert LeadRequest.objects.get().status == 'failed'
+
+    def test_leads_are_sent_in_batches(self, bitrix):
+        for n in range(120):
+            create_profile(n)
+        bitrix.failing_emails.add('user7@example.com')
+
+        stats = drain_lead_requests(BitrixClient(bitrix.webhook), batch_size=120)
+
+        assert [len(batch) for batch in bitrix.batches] == [50, 50, 20]
+        assert stats['batches'] == 3
+        assert stats['fill_ratio'] == pytest.approx(0.8)
+        assert stats['leads_per_second'] > 0
+        assert (stats['sent'], stats['error']) == (119, 1)
+        assert LeadRequest.objects.get(email='user7@example.com').status == 'error'
+        assert bitrix.calls[0][1]['fields']['EMAIL'][0]['VALUE'].endswith('@example.com')
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` lookup of published programs, projects and organizations.
+"""
+import pytest
+
+from cnot.cache import get_response_cache
+from cnot.core.lookup import LookupCache, get_lookup_cache, lookup_published
+from cnot.core.models import Organization, Program, Project
+from test_utils.factories import create_catalog
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    get_lookup_cache().clear()
+    get_response_cache().clear()
+
+
+def create_program(n=0, **kwargs):
+    kwargs.setdefault('status', 'published')
+    return Program.objects.create(title=f'Program {n}', short_name=f'p{n}', slug=f'program-{n}', **kwargs)
+
+
+@pytest.mark.django_db
+class TestLookupPublished:
+    """
+    Tests of cnot.core.lookup.lookup_published().
+    """
+
+    def test_lookup_by_slug_uuid_and_short_name(self, django_assert_num_queries):
+        program = create_program()
+
+        for identifier in ('program-0', str(program.uuid), 'p0'):
+            with django_assert_num_queries(1):
+                assert lookup_published(Program, identifier) == program
+            with django_assert_num_queries(0):
+                assert lookup_published(Program, identifier) == program
+
+    def test_slug_takes_precedence_over_short_name(self):
+        create_program(0)
+        program = Program.objects.create(title='Program', short_name='program-0-short', slug='p0', status='published')
+
+        assert lookup_published(Program, 'p0') == program
+
+    def test_unpublished_and_inactive_objects_are_not_found(self):
+        create_program(0, status='draft')
+        create_program(1, active=False)
+        Organization.objects.create(title='UrFU', short_name='urfu', slug='urfu', status='draft')
+
+        assert lookup_published(Program, 'program-0') is None
+        assert lookup_published(Program, 'program-1') is None
+        assert lookup_published(Organization, 'urfu') is None
+
+    def test_save_invalidates_cache(self, django_capture_on_commit_callbacks):
+        program = create_program()
+        assert lookup_published(Program, 'program-0').title == 'Program 0'
+
+        with django_capture_on_commit_callbacks(execute=True):
+            program.title = 'Renamed'
+            program.save()
+
+        assert lookup_published(Program, 'program-0').title == 'Renamed'
+
+    def test_callers_get_copies(self):
+        create_program()
+        lookup_published(Program, 'program-0').serialized_courses = []
+
+        assert not hasattr(lookup_published(Program, 'program-0'), 'serialized_courses')
+
+    def test_related_objects_are_copied(self):
+        org = Organization.objects.create(title='UrFU', short_name='urfu', slug='urfu', status='published')
+        create_program(owner=org)
+        lookup_published(Program, 'program-0').owner.title = 'Changed'
+
+        assert lookup_published(Program, 'program-0').owner.title == 'UrFU'
+
+    def test_clear_in_other_worker_invalidates_cache(self):
+        create_program()
+        assert lookup_published(Program, 'program-0').title == 'Program 0'
+        # queryset updates send no signals
+        Program.objects.update(title='Renamed')
+        assert lookup_published(Program, 'program-0').title == 'Program 0'
+
+        # the cache of another process sharing the Django cache
+        LookupCache(alias='default').clear()
+
+        assert lookup_published(Program, 'program-0').title == 'Renamed'
+
+    def test_entries_expire(self):
+        cache = LookupCache(timeout=0)
+        program = create_program()
+        cache.set(Program, 'program-0', program, cache.version())
+
+        assert cache.get(Program, 'program-0') is None
+
+    def test_object_read_during_invalidation_is_not_stored(self):
+        cache = LookupCache(alias='default')
+        program = create_program()
+        version = cache.version()
+
+        # another worker invalidates the cache while the object is read from the database
+        LookupCache(alias='default').clear()
+        cache.set(Program, 'program-0', program, version)
+
+        assert cache.get(Program, 'program-0') is None
+
+
+@pytest.mark.django_db
+class TestDetailEndpoints:
+    """
+    Tests of GET /programs/{id}, /projects/{id} and /orgs/{id}.
+    """
+
+    @pytest.mark.parametrize('courses_count', [1, 20])
+    def test_program_query_count_is_constant(self, client, courses_count, django_assert_num_queries):
+        program = create_program()
+        program.courses.set(create_catalog(courses_count))
+
+        # program with owner, program-course links, courses
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/programs/{program.uuid}', {'expand': ''})
+        assert len(response.json()['courses']) == courses_count
+
+        get_response_cache().clear()
+        with django_assert_num_queries(2):
+            client.get('/api/programs/p0', {'expand': ''})
+        with django_assert_num_queries(2):
+            client.get('/api/programs/program-0', {'expand': ''})
+
+    def test_project_and_organization(self, client):
+        org = Organization.objects.create(title='UrFU', short_name='urfu', slug='urfu', status='published')
+        project = Project.objects.create(title='Project', short_name='project', slug='project', status='published')
+        create_program(project=project, owner=org)
+
+        assert client.get('/api/orgs/urfu').json()['title'] == 'UrFU'
+        programs = client.get('/api/projects/project').json()['programs']
+        assert [program['slug'] for program in programs] == ['program-0']
+        assert programs[0]['owner']['slug'] == 'urfu'
+        assert client.get('/api/projects/missing').status_code == 404
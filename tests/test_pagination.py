@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` cursor pagination.
+"""
+import pytest
+from ninja.errors import HttpError
+
+from cnot.cache import get_response_cache
+from cnot.core.models import Organization
+from cnot.pagination import CursorPagination, encode_cursor
+from test_utils.benchmarks import benchmark, timed
+
+
+def create_orgs(size):
+    Organization.objects.bulk_create(Organization(title=f'Organization {i}', status='published') for i in range(size))
+    return list(Organization.objects.order_by('id'))
+
+
+def paginate(qs, cursor=None, limit=9, with_count=False, **kwargs):
+    pagination = CursorPagination.Input(cursor=cursor, limit=limit, with_count=with_count)
+    return CursorPagination(**kwargs).paginate_queryset(qs, pagination)
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+    """
+    Tests of CursorPagination.
+    """
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        get_response_cache().clear()
+
+    def test_pages_cover_all_rows_once(self, client):
+        create_orgs(20)
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 6, **({'cursor': cursor} if cursor else {})}
+            page = client.get('/api/orgs', params).json()
+            assert page['count'] is None
+            seen += [org['title'] for org in page['items']]
+            cursor = page['next']
+            if cursor is None:
+                break
+
+        assert seen == [f'Organization {i}' for i in range(20)]
+
+    def test_pages_are_stable_while_rows_change(self):
+        orgs = create_orgs(10)
+        first = paginate(Organization.objects.all(), limit=5, ordering=('modified', 'pk'))
+        Organization.objects.filter(pk=orgs[0].pk).delete()
+        Organization.objects.create(title='New', status='published')
+
+        second = paginate(Organization.objects.all(), cursor=first['next'], limit=5, ordering=('modified', 'pk'))
+
+        assert [org.pk for org in first['items'] + second['items']] == [org.pk for org in orgs]
+
+    def test_count_is_queried_on_request(self, django_assert_num_queries):
+        create_orgs(3)
+        with django_assert_num_queries(1):
+            assert paginate(Organization.objects.all())['count'] is None
+        with django_assert_num_queries(2):
+            assert paginate(Organization.objects.all(), with_count=True)['count'] == 3
+
+    def test_other_orderings_fall_back_to_offset(self):
+        orgs = create_orgs(5)
+        qs = Organization.objects.order_by('-title')
+        first = paginate(qs, limit=3)
+        second = paginate(qs, cursor=first['next'], limit=3)
+
+        assert [org.pk for org in first['items'] + second['items']] == [org.pk for org in reversed(orgs)]
+        assert second['next'] is None
+
+    def test_offset_of_former_clients(self, client):
+        create_orgs(20)
+
+        page = client.get('/api/orgs', {'limit': 6, 'offset': 18}).json()
+
+        assert [org['title'] for org in page['items']] == ['Organization 18', 'Organization 19']
+        assert page['count'] == 20
+        assert page['next'] is None
+
+    @pytest.mark.parametrize('data', [
+        {'offset': -1},
+        {'offset': '9'},
+        {'offset': True},
+        {'after': 5},
+        {'after': []},
+        {'after': [1, 2, 3]},
+        {'after': [{'id': 1}]},
+        {'after': ['not a date', 1]},
+    ])
+    def test_malformed_cursor(self, client, data):
+        # projects are ordered by ('modified', 'pk')
+        response = client.get('/api/projects', {'cursor': encode_cursor(data)})
+
+        assert response.status_code == 400
+
+    def test_invalid_cursor(self):
+        with pytest.raises(HttpError):
+            paginate(Organization.objects.all(), cursor='not a cursor')
+        with pytest.raises(HttpError):
+            paginate(Organization.objects.all(), cursor=encode_cursor(['offset', 9]))
+
+    def test_deep_page_starts_after_cursor(self, django_assert_num_queries):
+        orgs = create_orgs(1000)
+        qs = Organization.objects.all()
+
+        with django_assert_num_queries(1) as captured:
+            items = paginate(qs, cursor=encode_cursor({'after': [orgs[890].pk]}))['items']
+
+        assert [org.pk for org in items] == [org.pk for org in orgs[891:900]]
+        # the page starts right after the cursor instead of skipping rows
+        sql = captured.captured_queries[0]['sql']
+        assert f'"id" > {orgs[890].pk}' in sql
+        assert 'OFFSET' not in sql
+
+    @benchmark
+    def test_deep_page_costs_as_much_as_first(self):
+        orgs = create_orgs(10000)
+        qs = Organization.objects.all()
+        deep = encode_cursor({'after': [orgs[8990].pk]})
+
+        with timed('20 first pages'):
+            for _ in range(20):
+                paginate(qs)
+        with timed('20 pages 1000 by cursor'):
+            for _ in range(20):
+                paginate(qs, cursor=deep)
+        with timed('20 pages 1000 by offset'):
+            for _ in range(20):
+                list(qs.order_by('id')[8991:9000])
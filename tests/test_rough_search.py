@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` utils module.
+"""
+from cnot.utils import resolve_keys, rough_get, rough_search
+from test_utils.feeds import make_feed
+
+
+class TestRoughSearch:
+    """
+    Tests of fuzzy key resolution.
+    """
+
+    def test_closest_key_is_used(self):
+        assert rough_search({'displayname': 'Python', 'lang': 'ru'}, 'display_name') == 'Python'
+
+    def test_exact_key_wins(self):
+        assert rough_get({'startdate': 1, 'start_date': 2}, ['startdate']) == {'startdate': 1}
+
+    def test_max_distance_rejects_wrong_matches(self):
+        dct = {'start_date': '2030-09-01', 'title': 'Python'}
+
+        assert rough_get(dct, ['startdate', 'enddate'], max_distance=2) == {'startdate': '2030-09-01', 'enddate': None}
+
+    def test_resolution_is_cached_per_schema(self):
+        resolve_keys.cache_clear()
+        feed = make_feed(1000)
+
+        values = [rough_get(course, ('display_name', 'startdate', 'enddate'), max_distance=2) for course in feed]
+
+        assert values[10]['display_name'] == 'Course 10'
+        assert resolve_keys.cache_info().misses == 1
+        assert resolve_keys.cache_info().hits == 999
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` course search.
+"""
+import itertools
+
+import pytest
+
+from cnot.courses import search
+from cnot.courses.catalog import rebuild_catalog_entries
+from cnot.courses.models import Author, Competence, Course, CourseSearchDocument
+from cnot.courses.search import PythonSearchBackend, stem, to_cyrillic, to_latin
+from test_utils.benchmarks import benchmark, timed
+from test_utils.factories import create_catalog, create_course
+
+
+@pytest.fixture(autouse=True)
+def search_backend(monkeypatch):
+    backend = PythonSearchBackend()
+    monkeypatch.setattr(search, '_search_backend', backend)
+    return backend
+
+
+def test_stem_matches_word_forms():
+    assert len({stem(word) for word in ('программирование', 'программирования', 'программированию')}) == 1
+    assert stem('Курсов') == stem('курсы') == 'курс'
+
+
+@pytest.mark.django_db
+class TestPythonSearchBackend:
+    """
+    Tests of the in-process search backend used with SQLite.
+    """
+
+    def test_title_matches_rank_first(self, search_backend):
+        in_body = create_course(display_name='Анализ данных', description='Основы программирования на Python')
+        in_title = create_course(display_name='Программирование на Python')
+        create_course(display_name='История')
+        rebuild_catalog_entries()
+
+        hits = search_backend.search('программированию python')
+
+        assert [hit.course_id for hit in hits] == [in_title.id, in_body.id]
+        assert hits[0].highlight == '<b>Программирование</b> на <b>Python</b>'
+        assert '<b>программирования</b>' in hits[1].highlight
+
+    def test_filter_keeps_queryset_filters(self, search_backend):
+        visible = create_course(display_name='Машинное обучение')
+        create_course(display_name='Машинное обучение', catalog_visibility='none')
+        rebuild_catalog_entries()
+
+        qs = search_backend.filter(Course.objects.catalog_visible(), 'обучения')
+
+        assert list(qs) == [visible]
+        assert not search_backend.filter(Course.objects.all(), 'химия').exists()
+
+    def test_index_follows_competence_saves(self, search_backend):
+        course = create_course(display_name='Экономика')
+        rebuild_catalog_entries()
+        assert search_backend.search('логистика') == []
+
+        Competence.objects.create(course=course, title='Управление логистикой')
+        rebuild_catalog_entries([course.id])
+        assert [hit.course_id for hit in search_backend.search('логистика')] == [course.id]
+
+        course.delete()
+        rebuild_catalog_entries([course.id])
+        assert search_backend.search('логистика') == []
+
+    def test_search_runs_no_queries(self, search_backend, django_assert_num_queries):
+        create_catalog(100)
+        physics = create_course(display_name='Квантовая физика')
+        rebuild_catalog_entries()
+        search_backend.search('физика')
+
+        with django_assert_num_queries(0):
+            hits = search_backend.search('квантовой физики')
+
+        assert [hit.course_id for hit in hits] == [physics.id]
+
+    def test_index_of_other_worker_is_reloaded(self, search_backend):
+        other_worker = PythonSearchBackend(max_age=0)
+        assert other_worker.search('логистика') == []
+
+        course = create_course(display_name='Логистика')
+        rebuild_catalog_entries([course.id])
+
+        assert [hit.course_id for hit in other_worker.search('логистика')] == [course.id]
+
+
+def test_transliteration():
+    assert to_cyrillic('Python') == 'питон'
+    assert to_latin('Щукин') == 'shchukin'
+
+
+@pytest.mark.django_db
+class TestTrigramSearch:
+    """
+    Tests of the typo-tolerant search by course names.
+    """
+
+    def test_typos_and_transliteration(self, search_backend):
+        python = create_course(display_name='Python для начинающих')
+        statistics = create_course(display_name='Статистика')
+        Author.objects.create(course=statistics, name='Иван Петров', description='', photo='author.png')
+        create_course(display_name='История искусств')
+        rebuild_catalog_entries()
+        qs = Course.objects.catalog_visible()
+
+        assert list(search_backend.similar(qs, 'питон')) == [python]
+        assert list(search_backend.similar(qs, 'pyton')) == [python]
+        assert list(search_backend.similar(qs, 'статистка')) == [statistics]
+        assert list(search_backend.similar(qs, 'petrov')) == [statistics]
+        assert not search_backend.similar(qs, 'химия').exists()
+
+    def test_limit_and_threshold_are_configurable(self, search_backend, settings):
+        courses = [create_course(display_name=f'Программирование {level}') for level in ('I', 'II', 'III')]
+        rebuild_catalog_entries()
+        qs = Course.objects.all()
+
+        settings.CNOT_TRIGRAM_LIMIT = 2
+        assert list(search_backend.similar(qs, 'програмирование')) == courses[:2]
+        assert search_backend.similar(qs, 'програм', limit=5).count() == 3
+
+        settings.CNOT_TRIGRAM_THRESHOLD = 0.9
+        assert not search_backend.similar(qs, 'програмирование').exists()
+
+    @pytest.mark.parametrize('per_level', [
+        4,
+        pytest.param(200, marks=benchmark, id='10k-courses'),
+    ])
+    def test_ranking_of_many_similar_names(self, search_backend, per_level):
+        subjects = ['Программирование', 'Python', 'Машинное обучение', 'Статистика', 'Экономика',
+                    'Менеджмент', 'Физика', 'Химия', 'История', 'Дизайн']
+        levels = ['для начинающих', 'продвинутый курс', 'практикум', 'основы', 'интенсив']
+        search_backend.rank_similar('')  # load the empty index
+        documents = []
+        for course_id, (subject, level, n) in enumerate(itertools.product(subjects, levels, range(per_level)), 1):
+            title = f'{subject} {level} {n}'
+            names = '\n'.join(dict.fromkeys([title, to_latin(title), to_cyrillic(title)]))
+            documents.append(CourseSearchDocument(course_id=course_id, title=title, names=names))
+        with timed(f'trigram index of {len(documents)} courses'):
+            search_backend.update(documents)
+
+        expected = {
+            'питон': 'Python', 'машиное обучение': 'Машинное обучение',
+            'statistika': 'Статистика', 'экономка основы': 'Экономика основы',
+        }
+        with timed(f'{len(expected)} trigram queries over {len(documents)} courses'):
+            for query, title in expected.items():
+                ranked = search_backend.rank_similar(query)
+                assert documents[ranked[0][0] - 1].title.startswith(title), query
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` serialization of courses shared by programs.
+"""
+import pytest
+
+from cnot.core.models import Program
+from cnot.courses.catalog import rebuild_catalog_entries
+from cnot.schema import CourseSchema, ProgramSchema
+from cnot.serialization import attach_courses
+from test_utils.benchmarks import benchmark, timed
+from test_utils.factories import create_catalog, fill_course
+
+
+def create_programs(count, courses):
+    programs = []
+    for n in range(count):
+        program = Program.objects.create(
+            title=f'Program {n}', short_name=f'p{n}', slug=f'program-{n}', status='published',
+        )
+        program.courses.set(courses)
+        programs.append(program)
+    return programs
+
+
+@pytest.mark.django_db
+class TestAttachCourses:
+    """
+    Tests of cnot.serialization.attach_courses().
+    """
+
+    def test_shared_course_is_serialized_once(self):
+        courses = create_catalog(3)
+        create_programs(2, courses[:2])
+        Program.objects.get(slug='program-1').courses.add(courses[2])
+
+        programs = attach_courses(Program.objects.order_by('slug'))
+        first, second = (program.serialized_courses for program in programs)
+
+        assert sorted(course.id for course in first) == [course.id for course in courses[:2]]
+        assert sorted(course.id for course in second) == [course.id for course in courses]
+        assert {id(course) for course in first} < {id(course) for course in second}
+
+        rendered = [ProgramSchema.from_orm(program).dict() for program in programs]
+        assert {id(course) for course in rendered[0]['courses']} < {id(course) for course in rendered[1]['courses']}
+        assert set(rendered[0]['courses'][0]) == {'id', 'slug', 'display_name', 'course_image_url'}
+
+    def test_courses_without_entries_are_built_when_expanded(self):
+        courses = create_catalog(2)
+        fill_course(courses[1])
+        rebuild_catalog_entries([courses[0].id])
+        program = create_programs(1, courses)[0]
+
+        attach_courses([program], {'courses'})
+
+        rendered = sorted(ProgramSchema.from_orm(program).dict()['courses'], key=lambda course: course['id'])
+        assert [course['id'] for course in rendered] == [course.id for course in courses]
+        assert rendered[1]['results'] == ['Result 0', 'Result 1', 'Result 2']
+        assert rendered[1]['likes'] == 0
+
+    def test_rendering_options_are_not_shared(self):
+        program = create_programs(1, create_catalog(1))[0]
+        course = attach_courses([program])[0].serialized_courses[0]
+
+        assert course.dict() is course.dict()
+        assert set(course.dict(exclude={'slug'})) == {'id', 'display_name', 'course_image_url'}
+        assert 'slug' in course.dict()
+
+    def test_no_queries_without_programs(self, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            assert attach_courses(Program.objects.none()) == []
+
+
+@pytest.mark.parametrize('courses_count, programs_count', [
+    (5, 4),
+    pytest.param(30, 50, marks=benchmark, id='heavy-overlap'),
+])
+@pytest.mark.django_db
+def test_overlapping_programs(courses_count, programs_count, django_assert_num_queries):
+    courses = create_catalog(courses_count)
+    for course in courses:
+        fill_course(course)
+    rebuild_catalog_entries([course.id for course in courses])
+    create_programs(programs_count, courses)
+
+    with timed(f'every course of {programs_count} programs serialized on its own'):
+        programs = Program.objects.prefetch_related('courses__catalog_entry', 'courses__stats')
+        naive = [
+            [CourseSchema.parse_obj(course.catalog_payload).dict() for course in program.courses.all()]
+            for program in programs
+        ]
+
+    with timed(f'{courses_count} shared courses of {programs_count} programs'):
+        with django_assert_num_queries(3):
+            programs = attach_courses(Program.objects.all(), {'courses'})
+        shared = [ProgramSchema.from_orm(program).dict()['courses'] for program in programs]
+
+    links = sum(len(program_courses) for program_courses in shared)
+    unique = {id(course) for program_courses in shared for course in program_courses}
+    assert links == courses_count * programs_count
+    assert len(unique) == courses_count
+    assert [sorted(c['id'] for c in program_courses) for program_courses in shared] == [
+        sorted(c['id'] for c in program_courses) for program_courses in naive
+    ]
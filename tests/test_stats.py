@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` course popularity counters.
+"""
+import pytest
+from common.djangoapps.student.models import CourseEnrollment
+from common.djangoapps.student.tests.factories import UserFactory
+
+from cnot.cache import get_response_cache
+from cnot.courses.catalog import rebuild_catalog_entries
+from cnot.courses.models import Course, CourseStats, LikedCourse
+from cnot.learners.models import LearningRequest
+from test_utils.factories import create_catalog, create_course
+
+
+def counters(course):
+    stats = CourseStats.objects.get(course=course)
+    return stats.likes, stats.learning_requests, stats.enrollments
+
+
+@pytest.mark.django_db
+class TestCourseStats:
+    """
+    Tests of CourseStats counters.
+    """
+
+    def test_signals_update_counters(self):
+        course = create_course()
+        users = [UserFactory() for _ in range(3)]
+
+        for user in users:
+            LikedCourse.objects.create(user=user, course=course)
+        LearningRequest.objects.create(user=users[0], course_id=course.id)
+        CourseEnrollment.enroll(users[0], course.course_overview.id)
+        CourseEnrollment.enroll(users[1], course.course_overview.id)
+        CourseEnrollment.unenroll(users[1], course.course_overview.id)
+        assert counters(course) == (3, 1, 1)
+
+        LikedCourse.objects.filter(user=users[0]).delete()
+        assert counters(course) == (2, 1, 1)
+
+    def test_likes_keep_cached_responses(self, client, django_capture_on_commit_callbacks):
+        course = create_course()
+        rebuild_catalog_entries([course.id])
+        get_response_cache().clear()
+        assert client.get(f'/api/courses/{course.id}').json()['likes'] == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            LikedCourse.objects.create(user=UserFactory(), course=course)
+
+        # counters in cached responses are up to CNOT_RESPONSE_CACHE_TIMEOUT old
+        assert client.get(f'/api/courses/{course.id}').json()['likes'] == 0
+        get_response_cache().clear()
+        assert client.get(f'/api/courses/{course.id}').json()['likes'] == 1
+
+    def test_bulk_likes_update_counters(self):
+        courses = create_catalog(3)
+        ids = [course.id for course in courses]
+        users = [UserFactory() for _ in range(2)]
+
+        for user in users:
+            LikedCourse.like(user, ids)
+            LikedCourse.like(user, ids)
+        LikedCourse.unlike(users[0], ids[:1])
+
+        assert [counters(course)[0] for course in courses] == [1, 2, 2]
+
+    def test_unlike_updates_counters_once(self, django_assert_num_queries):
+        courses = create_catalog(3)
+        ids = [course.id for course in courses]
+        user = UserFactory()
+        LikedCourse.like(user, ids)
+
+        # one DELETE and the recount (missing stats rows, UPDATE), no per-like post_delete updates
+        with django_assert_num_queries(3):
+            assert LikedCourse.unlike(user, ids) == 3
+
+        assert [counters(course)[0] for course in courses] == [0, 0, 0]
+
+    def test_reconcile_fixes_drift(self):
+        course, other = create_catalog(2)
+        user = UserFactory()
+        LikedCourse.objects.create(user=user, course=course)
+        LearningRequest.objects.create(user=user, course_id=course.id)
+        CourseStats.objects.filter(course=course).update(likes=10, learning_requests=0)
+
+        assert CourseStats.reconcile() == 1
+        assert counters(course) == (1, 1, 0)
+        assert counters(other) == (0, 0, 0)
+        assert CourseStats.reconcile() == 0
+
+    def test_catalog_is_sortable_by_counters(self, django_assert_num_queries):
+        courses = create_catalog(3)
+        rebuild_catalog_entries()
+        CourseStats.increment([courses[1].id], likes=5)
+        CourseStats.increment([courses[2].id], likes=2)
+
+        with django_assert_num_queries(1):
+            page = list(Course.objects.catalog_visible().order_by_counter('-likes').catalog_payloads()[:3])
+
+        assert [(item['id'], item['likes']) for item in page] == [
+            (courses[1].id, 5), (courses[2].id, 2), (courses[0].id, 0),
+        ]
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+"""
+Tests for the `cnot-edx` external platform synchronization.
+"""
+import tracemalloc
+
+import pytest
+from django.db import IntegrityError
+
+from cnot.core import sync
+from cnot.core.models import ExternalPlatform
+from cnot.core.sync import iter_batches, iter_feed, sync_external_platforms
+from cnot.courses.models import Course
+from test_utils.benchmarks import benchmark, timed
+from test_utils.feeds import FeedServer, make_feed, write_feed
+
+
+@pytest.fixture
+def feeds():
+    with FeedServer() as server:
+        yield server
+
+
+@pytest.mark.django_db
+class TestSyncExternalPlatforms:
+    """
+    Tests of sync_external_platforms.
+    """
+
+    def test_only_changed_courses_are_written(self, feeds):
+        feeds.feeds['a.json'] = make_feed(30)
+        feeds.feeds['b.json'] = make_feed(20, prefix='Other')
+        platform_a = ExternalPlatform.objects.create(title='A', sources_list_url=feeds.url('a.json'))
+        platform_b = ExternalPlatform.objects.create(title='B', sources_list_url=feeds.url('b.json'))
+
+        results = sync_external_platforms()
+        assert results[platform_a.pk] == {'created': 30, 'updated': 0, 'unchanged': 0}
+        assert results[platform_b.pk]['created'] == 20
+        assert Course.objects.filter(external=True).count() == 50
+
+        feeds.feeds['a.json'][3]['description'] = 'Changed'
+        results = sync_external_platforms()
+
+        assert results[platform_a.pk] == {'created': 0, 'updated': 1, 'unchanged': 29}
+        assert results[platform_b.pk] == {'not_modified': True}
+        assert Course.objects.get(external_platform=platform_a, external_id='3').description == 'Changed'
+        assert len(feeds.requests) == 4
+
+    def test_assimilated_courses_are_adopted(self, feeds):
+        feeds.feeds['a.json'] = make_feed(1)
+        platform = ExternalPlatform.objects.create(title='A', sources_list_url=feeds.url('a.json'))
+        legacy = Course.create_or_update_external(make_feed(1)[0])
+
+        sync_external_platforms()
+
+        legacy.refresh_from_db()
+        assert legacy.external_platform == platform
+        assert legacy.external_id == '0'
+        assert Course.objects.filter(external=True).count() == 1
+
+    def test_assimilate_refreshes_removed_course(self, feeds):
+        platform = ExternalPlatform.objects.create(title='A', sources_list_url=feeds.url('a.json'))
+        ext_course = make_feed(1)[0]
+        course = platform.assimilate(ext_course)
+        course.delete()
+
+        ext_course['description'] = 'Changed'
+        assimilated = platform.assimilate(ext_course)
+
+        assert assimilated.pk == course.pk
+        assert assimilated.description == 'Changed'
+        assert assimilated.is_removed
+
+    def test_failing_platform_does_not_stop_others(self, feeds, monkeypatch):
+        feeds.feeds['a.json'] = make_feed(3)
+        feeds.feeds['b.json'] = make_feed(2, prefix='Other')
+        platform_a = ExternalPlatform.objects.create(title='A', sources_list_url=feeds.url('a.json'))
+        platform_b = ExternalPlatform.objects.create(title='B', sources_list_url=feeds.url('b.json'))
+
+        def upsert(platform, ext_courses):
+            if platform.pk == platform_a.pk:
+                raise IntegrityError('duplicate key')
+            return Course.bulk_upsert_external(ext_courses, platform=platform)
+
+        monkeypatch.setattr(sync, 'upsert_external_courses', upsert)
+        results = sync_external_platforms(batch_size=1)
+
+        assert results[platform_a.pk] == {'created': 0, 'updated': 0, 'unchanged': 0, 'error': 'duplicate key'}
+        assert results[platform_b.pk] == {'created': 2, 'updated': 0, 'unchanged': 0}
+        assert not ExternalPlatform.objects.get(pk=platform_a.pk).feed_etag
+
+
+@pytest.mark.django_db
+class TestBulkUpsertExternal:
+    """
+    Tests and benchmark of Course.bulk_upsert_external.
+    """
+
+    def test_history_is_written(self):
+        Course.bulk_upsert_external(make_feed(3))
+        feed = make_feed(3)
+        feed[0]['description'] = 'Changed'
+
+        stats = Course.bulk_upsert_external(feed)
+
+        assert stats == {'created': 0, 'updated': 1, 'unchanged': 2}
+        course = Course.objects.get(display_name_f='Course 0')
+        assert [record.description for record in course.history.order_by('history_id')] == [
+            'Description of course 0', 'Changed',
+        ]
+
+    def test_long_ids_with_a_common_prefix(self):
+        platform = ExternalPlatform.objects.create(title='A')
+        feed = make_feed(2)
+        for i, ext_course in enumerate(feed):
+            ext_course['id'] = f'https://courses.example.com/catalog/programming/python/{i}'
+
+        assert Course.bulk_upsert_external(feed, platform=platform)['created'] == 2
+        assert len(set(Course.objects.values_list('slug', flat=True))) == 2
+
+    def test_rows_without_id_are_logged(self, caplog):
+        platform = ExternalPlatform.objects.create(title='A')
+        feed = make_feed(3)
+        del feed[1]['id']
+
+        assert Course.bulk_upsert_external(feed, platform=platform)['created'] == 2
+        assert f'Skipped 1 courses without an id in the feed of platform {platform.pk}' in caplog.text
+
+    @pytest.mark.parametrize('size', [100, 1000])
+    def test_query_count_per_chunk(self, size, django_assert_max_num_queries):
+        with django_assert_max_num_queries(10 + 4 * size // 500):
+            stats = Course.bulk_upsert_external(make_feed(size, prefix='Bulk'))
+
+        assert stats['created'] == size
+
+    @benchmark
+    @pytest.mark.parametrize('size', [1000, 10000])
+    def test_benchmark_against_per_row_path(self, size):
+        feed = make_feed(size, prefix='Bulk')
+        with timed(f'bulk upsert of {size} rows'):
+            Course.bulk_upsert_external(feed)
+
+        per_row_feed = make_feed(min(size, 1000), prefix='Row')
+        with timed(f'per-row upsert of {len(per_row_feed)} rows'):
+            for ext_course in per_row_feed:
+                Course.create_or_update_external(ext_course)
+
+
+class TestStreamingFeed:
+    """
+    Tests of incremental feed parsing.
+    """
+
+    def test_feed_is_parsed_in_batches(self, tmp_path):
+        path = write_feed(tmp_path / 'feed.json', 1200)
+
+        with path.open('rb') as stream:
+            sizes = [len(batch) for batch in iter_batches(iter_feed(stream), 500)]
+
+        assert sizes == [500, 500, 200]
+
+    @benchmark
+    def test_memory_stays_flat_on_large_feed(self, tmp_path):
+        path = write_feed(tmp_path / 'feed.json', 50000)
+
+        tracemalloc.start()
+        with path.open('rb') as stream:
+            count = sum(len(batch) for batch in iter_batches(iter_feed(stream), 500))
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert count == 50000
+        assert peak < path.stat().st_size / 4
+
+
+@pytest.mark.django_db
+class TestStreamingSync:
+    """
+    Tests of sync_external_platforms over a large streamed feed.
+    """
+
+    def test_large_feed_is_written_in_batches(self, feeds, tmp_path):
+        feeds.feeds['large.json'] = write_feed(tmp_path / 'large.json', 5000)
+        platform = ExternalPlatform.objects.create(title='Large', sources_list_url=feeds.url('large.json'))
+
+        results = sync_external_platforms(batch_size=250)
+
+        assert results[platform.pk] == {'created': 5000, 'updated': 0, 'unchanged': 0}
+        assert ExternalPlatform.objects.get(pk=platform.pk).feed_etag